@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def synchronous_thumbnails(settings):
+    # A worker thread cannot write to the in-memory test database while
+    # the test holds it, so thumbnails are rendered on commit instead.
+    settings.POST_THUMBNAILS_ASYNC = False
@@ -0,0 +1,326 @@
+"""Cache backend speaking the Redis protocol (RESP) over a pooled socket.
+
+Any Redis-compatible server works. Values are pickled, integers are stored
+as plain numbers so that INCRBY works on them. When the server is down the
+backend falls back to process-local memory and retries the server after
+``RETRY_INTERVAL`` seconds.
+
+Whatever was written meanwhile, invalidations included, stayed in that
+process, so entries kept on the server may be stale after an outage. The
+local copy is dropped and ``recovered`` is sent when the server answers
+again, for the users of the cache to invalidate what they depend on.
+"""
+import pickle
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.dispatch import Signal
+
+CRLF = b'\r\n'
+
+recovered = Signal()
+
+
+class RedisError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    @staticmethod
+    def encode(command):
+        parts = [b'*%d\r\n' % len(command)]
+        for arg in command:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif isinstance(arg, int):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def execute(self, *commands):
+        """Sends all commands in one write and reads one reply for each."""
+        self.sock.sendall(b''.join(map(self.encode, commands)))
+        return [self.read_reply() for _ in commands]
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line.endswith(CRLF):
+            raise ConnectionError('Connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            return RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise ConnectionError(f'Unexpected reply {line!r}')
+
+
+class ConnectionPool:
+    def __init__(self, host, port, db=0, max_connections=10, timeout=0.5):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self.idle = deque()
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.created = 0
+        self.overflow = 0
+
+    def _connect(self):
+        connection = Connection(self.host, self.port, self.timeout)
+        self.created += 1
+        if self.db:
+            connection.execute(('SELECT', self.db))
+        return connection
+
+    @contextmanager
+    def connection(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            # A burst of traffic, not an outage: the command gets a
+            # connection of its own rather than the local fallback.
+            self.overflow += 1
+            connection = self._connect()
+            try:
+                yield connection
+            finally:
+                connection.close()
+            return
+        try:
+            try:
+                connection = self.idle.pop()
+            except IndexError:
+                connection = self._connect()
+            try:
+                yield connection
+            except BaseException:
+                connection.close()
+                raise
+            self.idle.append(connection)
+        finally:
+            self.slots.release()
+
+    def disconnect(self):
+        while self.idle:
+            self.idle.pop().close()
+
+
+class RedisCache(BaseCache):
+    RETRY_INTERVAL = 5
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        url = urlparse(server)
+        options = params.get('OPTIONS') or {}
+        self.pool = ConnectionPool(
+            url.hostname or 'localhost',
+            url.port or 6379,
+            db=int(url.path.strip('/') or 0),
+            max_connections=options.get('MAX_CONNECTIONS', 10),
+            timeout=options.get('SOCKET_TIMEOUT', 0.5),
+        )
+        self.retry_interval = options.get(
+            'RETRY_INTERVAL', self.RETRY_INTERVAL
+        )
+        self.fallback = LocMemCache(f'redis-fallback:{server}', params)
+        self.down_until = 0
+        self.degraded = False
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def _execute(self, *commands):
+        with self.pool.connection() as connection:
+            replies = connection.execute(*commands)
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _call(self, method, *args, **kwargs):
+        """Runs a command on the server or, if it is down, on local memory."""
+        if self.available:
+            try:
+                result = getattr(self, '_' + method)(*args, **kwargs)
+            except OSError:
+                self.down_until = time.monotonic() + self.retry_interval
+                self.degraded = True
+                self.pool.disconnect()
+            else:
+                if self.degraded:
+                    self._recover()
+                return result
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    def _recover(self):
+        self.degraded = False
+        self.fallback.clear()
+        recovered.send(sender=self.__class__, cache=self)
+
+    @staticmethod
+    def _expired(timeout):
+        return (
+            timeout is not None and timeout != DEFAULT_TIMEOUT and timeout <= 0
+        )
+
+    def _expiry(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        return ('PX', max(int(timeout * 1000), 1))
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(data):
+        if data is None:
+            return None
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _set_command(self, key, value, timeout, *flags):
+        return ('SET', key, self._dump(value)) + self._expiry(timeout) + flags
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('add', key, value, timeout, version)
+
+    def _add(self, key, value, timeout, version):
+        if self._expired(timeout):
+            return False
+        command = self._set_command(
+            self._key(key, version), value, timeout, 'NX'
+        )
+        return self._execute(command)[0] is not None
+
+    def get(self, key, default=None, version=None):
+        return self._call('get', key, default, version)
+
+    def _get(self, key, default, version):
+        value = self._load(self._execute(('GET', self._key(key, version)))[0])
+        return default if value is None else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._call('set', key, value, timeout, version)
+
+    def _set(self, key, value, timeout, version):
+        key = self._key(key, version)
+        if self._expired(timeout):
+            self._execute(('DEL', key))
+            return
+        self._execute(self._set_command(key, value, timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('touch', key, timeout, version)
+
+    def _touch(self, key, timeout, version):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if not expiry:
+            return bool(self._execute(('PERSIST', key), ('EXISTS', key))[1])
+        return bool(self._execute(('PEXPIRE', key, expiry[1]))[0])
+
+    def delete(self, key, version=None):
+        self._call('delete', key, version)
+
+    def _delete(self, key, version):
+        self._execute(('DEL', self._key(key, version)))
+
+    def has_key(self, key, version=None):
+        return self._call('has_key', key, version)
+
+    def _has_key(self, key, version):
+        return bool(self._execute(('EXISTS', self._key(key, version)))[0])
+
+    def incr(self, key, delta=1, version=None):
+        return self._call('incr', key, delta, version)
+
+    def _incr(self, key, delta, version):
+        key = self._key(key, version)
+        if not self._execute(('EXISTS', key))[0]:
+            raise ValueError("Key '%s' not found" % key)
+        try:
+            return self._execute(('INCRBY', key, delta))[0]
+        except RedisError as error:
+            raise ValueError(str(error))
+
+    def get_many(self, keys, version=None):
+        return self._call('get_many', keys, version)
+
+    def _get_many(self, keys, version):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self._key(key, version) for key in keys]
+        values = self._execute(('MGET', *made))[0]
+        return {
+            key: self._load(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set_many', data, timeout, version)
+
+    def _set_many(self, data, timeout, version):
+        if not data:
+            return []
+        if self._expired(timeout):
+            self._delete_many(data, version)
+            return []
+        self._execute(*(
+            self._set_command(self._key(key, version), value, timeout)
+            for key, value in data.items()
+        ))
+        return []
+
+    def delete_many(self, keys, version=None):
+        self._call('delete_many', keys, version)
+
+    def _delete_many(self, keys, version):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute(('DEL', *keys))
+
+    def clear(self):
+        self._call('clear')
+
+    def _clear(self):
+        self._execute(('FLUSHDB',))
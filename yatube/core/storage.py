@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HASHED_NAME = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}\.\w+$')
+HASHED_STATIC_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+COMPRESSIBLE = (
+    '.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.ico', '.html',
+)
+
+
+@deconstructible
+class HashedStorage(FileSystemStorage):
+    """Names files after the SHA-256 of their content.
+
+    ``posts/cat.gif`` is stored as ``posts/ab/ab….gif``; an upload that is
+    already stored is not written again and gets the existing name, so
+    identical files are kept once however many times they are uploaded.
+    """
+
+    @staticmethod
+    def hashed_name(name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    @staticmethod
+    def is_hashed(name):
+        return HASHED_NAME.search(name) is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # A fresh mtime keeps the orphan collector's grace period.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Fingerprinted static files with gzip and brotli copies beside them.
+
+    ``collectstatic`` writes ``app.<hash>.css.gz`` (and ``.br`` when the
+    optional ``brotli`` package is installed), so neither the proxy nor
+    ``serve_static`` compresses anything per request. Files that were not
+    collected, as in development and tests, keep their plain names.
+    """
+
+    @staticmethod
+    def is_hashed(name):
+        return HASHED_STATIC_NAME.search(name) is not None
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.lower().endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        for extension, compress in _compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + extension):
+                self.delete(name + extension)
+            self.save(name + extension, ContentFile(compressed))
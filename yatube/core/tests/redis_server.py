@@ -0,0 +1,141 @@
+"""A tiny in-process server speaking enough of the Redis protocol for tests."""
+import socketserver
+import threading
+import time
+
+
+class Store:
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+        self.commands = []
+        self.connections = 0
+
+    def alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def execute(self, name, args):
+        handler = getattr(self, 'cmd_' + name.lower(), None)
+        if handler is None:
+            return Exception(f'ERR unknown command {name}')
+        with self.lock:
+            self.commands.append(name.upper())
+            return handler(*args)
+
+    def cmd_ping(self):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        self.expires.clear()
+        return 'OK'
+
+    def cmd_get(self, key):
+        return self.data[key] if self.alive(key) else None
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        exists = self.alive(key)
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in ((b'EX', 1), (b'PX', 0.001)):
+            if unit in options:
+                ttl = int(options[options.index(unit) + 1]) * scale
+                self.expires[key] = time.monotonic() + ttl
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        deleted = 0
+        for key in keys:
+            if self.alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                deleted += 1
+        return deleted
+
+    def cmd_exists(self, *keys):
+        return sum(self.alive(key) for key in keys)
+
+    def cmd_incrby(self, key, delta):
+        value = self.data.get(key, b'0') if self.alive(key) else b'0'
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            return Exception('ERR value is not an integer or out of range')
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_pexpire(self, key, ttl):
+        if not self.alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(ttl) / 1000
+        return 1
+
+    def cmd_persist(self, key):
+        return int(self.expires.pop(key, None) is not None)
+
+
+def encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Exception):
+        return b'-%s\r\n' % str(reply).encode()
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(map(encode, reply))
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        with store.lock:
+            store.connections += 1
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            count = int(line[1:-2])
+            args = []
+            for _ in range(count):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            name = args[0].decode()
+            self.wfile.write(encode(store.execute(name, args[1:])))
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.store = Store()
+
+    @property
+    def url(self):
+        return 'redis://%s:%d/0' % self.server_address
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
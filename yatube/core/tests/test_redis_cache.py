@@ -0,0 +1,122 @@
+import socket
+import time
+
+from django.test import SimpleTestCase
+
+from ..redis_cache import RedisCache, recovered
+from .redis_server import RedisStandIn
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def closed_port_url():
+    return 'redis://127.0.0.1:%d/0' % closed_port()
+
+
+class RedisCacheTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = RedisStandIn().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(self.server.url, {'KEY_PREFIX': 'test'})
+        self.cache.clear()
+        self.server.store.commands.clear()
+
+    def test_basic_operations(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.assertTrue(self.cache.has_key('new'))
+        self.cache.delete('new')
+        self.assertIsNone(self.cache.get('new'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.incr('counter', 10), 12)
+        self.assertEqual(self.cache.get('counter'), 12)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('text', 'not a number')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+
+    def test_expiry(self):
+        self.cache.set('short', 'value', 0.05)
+        self.cache.set('gone', 'value', 0)
+        self.assertEqual(self.cache.get('short'), 'value')
+        self.assertIsNone(self.cache.get('gone'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+
+    def test_many_operations_are_pipelined(self):
+        data = {f'key{number}': number for number in range(20)}
+        self.cache.set_many(data)
+        self.assertEqual(self.cache.get_many(list(data) + ['none']), data)
+        self.cache.delete_many(list(data))
+        self.assertEqual(self.cache.get_many(list(data)), {})
+        self.assertEqual(
+            self.server.store.commands,
+            ['SET'] * 20 + ['MGET', 'DEL', 'MGET']
+        )
+
+    def test_connections_are_pooled(self):
+        for number in range(50):
+            self.cache.set('key', number)
+            self.cache.get('key')
+        self.assertEqual(self.cache.pool.created, 1)
+
+    def test_falls_back_to_local_memory(self):
+        cache = RedisCache(closed_port_url(), {'KEY_PREFIX': 'fallback'})
+        cache.set('key', 'value')
+        self.assertFalse(cache.available)
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(cache.get_many(['key']), {'key': 'value'})
+
+    def test_busy_pool_is_not_an_outage(self):
+        cache = RedisCache(
+            self.server.url,
+            {'OPTIONS': {'MAX_CONNECTIONS': 1, 'SOCKET_TIMEOUT': 0.05}}
+        )
+        with cache.pool.connection():
+            cache.set('key', 'value')
+        self.assertTrue(cache.available)
+        self.assertEqual(cache.pool.overflow, 1)
+        self.assertEqual(cache.get('key'), 'value')
+
+    def test_recovery_drops_local_writes(self):
+        received = []
+
+        def receiver(sender, cache, **kwargs):
+            received.append(cache)
+
+        recovered.connect(receiver)
+        self.addCleanup(recovered.disconnect, receiver)
+        cache = RedisCache(
+            self.server.url,
+            {'KEY_PREFIX': 'outage', 'OPTIONS': {'RETRY_INTERVAL': 0}}
+        )
+        cache.set('key', 'server')
+        port = cache.pool.port
+        cache.pool.disconnect()
+        cache.pool.port = closed_port()
+        cache.set('key', 'local')
+        self.assertEqual(cache.get('key'), 'local')
+        self.assertEqual(received, [])
+        cache.pool.port = port
+        self.assertEqual(cache.get('key'), 'server')
+        self.assertEqual(received, [cache])
+        self.assertIsNone(cache.fallback.get('key'))
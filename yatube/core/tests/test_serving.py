@@ -0,0 +1,136 @@
+import gzip
+import os
+import shutil
+import tempfile
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from ..storage import CompressedManifestStaticFilesStorage
+from ..views import IMMUTABLE, byte_range
+
+CONTENT = bytes(range(256)) * 4
+HASHED = 'posts/ab/ab' + '0' * 62 + '.jpg'
+STYLES = b'body { color: black; }\n' * 50
+
+
+class NginxStandIn:
+    """What nginx does with an ``X-Accel-Redirect`` to an internal location.
+
+    ``locations`` maps internal URL prefixes to directories, as ``alias``
+    does.
+    """
+
+    def __init__(self, locations):
+        self.locations = locations
+
+    def body(self, response):
+        target = unquote(response['X-Accel-Redirect'])
+        for prefix, directory in self.locations.items():
+            if target.startswith(prefix):
+                path = os.path.join(directory, target[len(prefix):])
+                with open(path, 'rb') as file:
+                    return file.read()
+        raise AssertionError(f'{target} is not an internal location')
+
+
+class ServingTest(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        for name in (HASHED, 'posts/legacy.jpg'):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, STATIC_ROOT=self.static_root
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_byte_ranges(self):
+        self.assertEqual(byte_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(byte_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(byte_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(byte_range('bytes=95-200', 100), (95, 99))
+        self.assertIs(byte_range('bytes=100-', 100), False)
+        self.assertIsNone(byte_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(byte_range('items=0-1', 100))
+
+    def test_media_range_requests(self):
+        url = f'{settings.MEDIA_URL}{HASHED}'
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(
+            b''.join(response.streaming_content), CONTENT[10:20]
+        )
+        response = self.client.get(url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        response = self.client.get(
+            url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='yesterday'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        legacy = self.client.get(f'{settings.MEDIA_URL}posts/legacy.jpg')
+        self.assertNotIn('Cache-Control', legacy)
+        self.assertEqual(
+            self.client.get(f'{settings.MEDIA_URL}../secret').status_code,
+            404
+        )
+
+    @override_settings(SENDFILE_HEADER='X-Accel-Redirect')
+    def test_proxy_sends_media(self):
+        nginx = NginxStandIn({
+            f'{settings.SENDFILE_PREFIX}media/': self.media_root,
+        })
+        response = self.client.get(f'{settings.MEDIA_URL}{HASHED}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(nginx.body(response), CONTENT)
+        with override_settings(SENDFILE_HEADER='X-Sendfile'):
+            response = self.client.get(f'{settings.MEDIA_URL}{HASHED}')
+        self.assertEqual(
+            response['X-Sendfile'], os.path.join(self.media_root, HASHED)
+        )
+
+    def test_collected_static_is_hashed_and_precompressed(self):
+        source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'app.css'), 'wb') as file:
+            file.write(STYLES)
+        with override_settings(STATICFILES_DIRS=[source]):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = CompressedManifestStaticFilesStorage().url('css/app.css')
+        self.assertRegex(url, r'/css/app\.[0-9a-f]{12}\.css$')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), STYLES)
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(b''.join(plain.streaming_content), STYLES)
+
+    def test_uncollected_static_keeps_plain_names(self):
+        storage = CompressedManifestStaticFilesStorage()
+        self.assertEqual(
+            storage.url('css/missing.css'),
+            f'{settings.STATIC_URL}css/missing.css'
+        )
@@ -0,0 +1,47 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, SimpleTestCase
+
+from ..storage import HashedStorage
+from ..views import IMMUTABLE, serve_media
+
+
+class HashedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = HashedStorage(location=self.root)
+
+    def test_files_are_named_after_content(self):
+        digest = hashlib.sha256(b'content').hexdigest()
+        name = self.storage.save('posts/Cat.JPG', ContentFile(b'content'))
+        self.assertEqual(name, f'posts/{digest[:2]}/{digest}.jpg')
+        self.assertTrue(HashedStorage.is_hashed(name))
+        self.assertFalse(HashedStorage.is_hashed('posts/cat.jpg'))
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        os.utime(self.storage.path(first), (0, 0))
+        second = self.storage.save('posts/b.gif', ContentFile(b'same'))
+        other = self.storage.save('posts/c.gif', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertGreater(os.path.getmtime(self.storage.path(first)), 0)
+        self.assertNotEqual(first, other)
+        files = [
+            name for _, _, names in os.walk(self.root) for name in names
+        ]
+        self.assertEqual(len(files), 2)
+
+    def test_hashed_media_is_cached_forever(self):
+        name = self.storage.save('posts/a.gif', ContentFile(b'gif'))
+        with open(os.path.join(self.root, 'posts', 'legacy.gif'), 'wb') as f:
+            f.write(b'gif')
+        request = RequestFactory().get('/media/')
+        response = serve_media(request, name, self.root)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        legacy = serve_media(request, 'posts/legacy.gif', self.root)
+        self.assertNotIn('Cache-Control', legacy)
@@ -1,4 +1,23 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .storage import CompressedManifestStaticFilesStorage, HashedStorage
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+# Preferred first.
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
 
 
 def page_not_found(request, exception):
@@ -13,3 +32,137 @@ def csrf_failure(request, reason=''):
     return render(request,
                   'core/403.html'
                   )
+
+
+def byte_range(header, size):
+    """Parses a single ``bytes=`` range into inclusive offsets.
+
+    Returns None when the whole file should be sent instead (no or
+    unsupported header) and False when the range cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if start:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        else:
+            start, end = max(size - int(end), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, path, size, content_type, modified):
+    range_ = byte_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != modified:
+        range_ = None
+    if range_ is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    elif range_ is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    else:
+        start, end = range_
+        response = StreamingHttpResponse(
+            _read(path, start, end - start + 1),
+            status=206, content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _precompressed(request, path):
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for encoding, extension in PRECOMPRESSED:
+        if encoding in accepted and os.path.isfile(path + extension):
+            return encoding, path + extension
+    return None, path
+
+
+def send_file(request, root, path, location, immutable=False,
+              precompressed=False):
+    """Sends a file under ``root`` with conditional and range support.
+
+    With ``settings.SENDFILE_HEADER`` set only the headers are built here
+    and the proxy sends the body from its internal ``location``.
+    """
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    encoding = None
+    if precompressed and not settings.SENDFILE_HEADER:
+        encoding, full_path = _precompressed(request, full_path)
+    stat = os.stat(full_path)
+    modified = http_date(stat.st_mtime)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime,
+        stat.st_size
+    ):
+        response = HttpResponseNotModified()
+    elif settings.SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type)
+        response[settings.SENDFILE_HEADER] = (
+            quote(f'{settings.SENDFILE_PREFIX}{location}/{path}')
+            if settings.SENDFILE_HEADER.lower() == 'x-accel-redirect'
+            else full_path
+        )
+    else:
+        response = _file_response(
+            request, full_path, stat.st_size, content_type, modified
+        )
+    response['Last-Modified'] = modified
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if precompressed:
+        response['Vary'] = 'Accept-Encoding'
+    if immutable:
+        response['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def serve_media(request, path, document_root=None):
+    """Serves uploads, caching content-addressed files forever.
+
+    Uploads are named after their content and thumbnails after their
+    source name, so neither can ever change under the same URL.
+    """
+    return send_file(
+        request, document_root or settings.MEDIA_ROOT, path, 'media',
+        immutable=(
+            HashedStorage.is_hashed(path)
+            or path.startswith(thumbnail_settings.THUMBNAIL_PREFIX)
+        )
+    )
+
+
+def serve_static(request, path):
+    """Serves collected static files, precompressed copies when accepted."""
+    return send_file(
+        request, settings.STATIC_ROOT, path, 'static',
+        immutable=CompressedManifestStaticFilesStorage.is_hashed(path),
+        precompressed=True
+    )
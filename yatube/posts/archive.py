@@ -0,0 +1,110 @@
+"""Posts by month of publication.
+
+Posts are dated on creation and never move to another month, so the page
+of a month that is over only changes when one of its posts is edited or
+deleted. Such pages are cached until then, under a scope of their own,
+instead of rotating with every new post like the numbered feed pages.
+
+Month pages link to the neighbouring months that have posts, so they also
+depend on the archive scope of their feed, which is bumped only when a
+month of that feed gets its first post or loses its last one.
+"""
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.http import Http404
+from django.utils import timezone
+
+from . import feed_cache
+from .models import Post
+
+LAST_YEAR = 9998
+
+
+def bounds(year, month):
+    """Start and end of a month in the current time zone.
+
+    Raises Http404 for something that is not a month or has not begun.
+    """
+    if not 1 <= year <= LAST_YEAR or not 1 <= month <= 12:
+        raise Http404('Такого месяца нет')
+    start = timezone.make_aware(datetime(year, month, 1))
+    if start > timezone.now():
+        raise Http404('Этот месяц ещё не наступил')
+    next_year, next_month = divmod(year * 12 + month, 12)
+    end = timezone.make_aware(datetime(next_year, next_month + 1, 1))
+    return start, end
+
+
+def month_of(post):
+    pub_date = timezone.localtime(post.pub_date)
+    return pub_date.year, pub_date.month
+
+
+def timeout(year, month, **kwargs):
+    """Pages of months that are over are fresh until they are bumped."""
+    start, end = bounds(year, month)
+    if end <= timezone.now():
+        return settings.ARCHIVE_CACHE_TIMEOUT or math.inf
+    return settings.FEED_CACHE_TIMEOUT
+
+
+def month_posts(queryset, year, month):
+    start, end = bounds(year, month)
+    return queryset.filter(pub_date__gte=start, pub_date__lt=end)
+
+
+def months(queryset):
+    """Months of ``queryset`` that have posts, newest first."""
+    return queryset.dates('pub_date', 'month', order='DESC')
+
+
+def neighbours(queryset, year, month):
+    """The closest earlier and later months with posts, or None."""
+    start, end = bounds(year, month)
+    dates = queryset.order_by().values_list('pub_date', flat=True)
+    previous = dates.filter(pub_date__lt=start).order_by('-pub_date').first()
+    following = dates.filter(pub_date__gte=end).order_by('pub_date').first()
+    return tuple(
+        pub_date and timezone.localtime(pub_date).date().replace(day=1)
+        for pub_date in (previous, following)
+    )
+
+
+def _feeds(post, group_slugs):
+    return [
+        (feed_cache.INDEX, {}),
+        (feed_cache.author_scope(post.author.username),
+         {'author_id': post.author_id}),
+        *((feed_cache.group_scope(slug), {'group__slug': slug})
+          for slug in group_slugs),
+    ]
+
+
+def month_scopes(post, group_slugs):
+    """Scopes of the month of ``post`` in the archives showing it."""
+    year, month = month_of(post)
+    return [
+        feed_cache.archive_scope(scope, year, month)
+        for scope, _ in _feeds(post, group_slugs)
+    ]
+
+
+def changed(post, group_slugs, moved=True):
+    """Bumps the archive pages showing ``post``.
+
+    ``group_slugs`` are the groups the post is or was in. The archive
+    scope of a feed is bumped too when ``moved`` and the month of the post
+    has no other post in that feed, as the months with posts changed.
+    """
+    year, month = month_of(post)
+    start, end = bounds(year, month)
+    scopes = []
+    for scope, lookups in _feeds(post, group_slugs):
+        scopes.append(feed_cache.archive_scope(scope, year, month))
+        if moved and not Post.objects.filter(
+            pub_date__gte=start, pub_date__lt=end, **lookups
+        ).exclude(pk=post.pk).exists():
+            scopes.append(feed_cache.archive_scope(scope))
+    feed_cache.bump(*scopes)
@@ -0,0 +1,69 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from . import feed_cache, thumbnails
+from .models import Comment, Post
+
+
+def post_state(request, post_id):
+    """Everything the post page shows that can change, in one query."""
+    if not hasattr(request, '_post_state'):
+        last_comment = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by('-created', '-id').values('created')[:1]
+        request._post_state = Post.objects.filter(pk=post_id).annotate(
+            last_comment=Subquery(last_comment)
+        ).values(
+            'updated',
+            'comments_count',
+            'author__stats__posts_count',
+            'group__title',
+            'group__slug',
+            'image',
+            'last_comment',
+        ).first()
+    return request._post_state
+
+
+def post_etag(request, post_id):
+    state = post_state(request, post_id)
+    if state is None:
+        return None
+    user = request.user.pk if request.user.is_authenticated else ''
+    parts = [str(value) for value in state.values()]
+    parts.append(str(thumbnails.ready(state['image'], 'card') is not None))
+    parts.extend(str(value) for value in feed_cache.generations(
+        (feed_cache.USERS,)
+    ))
+    parts.extend((
+        str(user), request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    ))
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def post_last_modified(request, post_id):
+    state = post_state(request, post_id)
+    if state is None:
+        return None
+    if state['last_comment'] is None:
+        return state['updated']
+    return max(state['updated'], state['last_comment'])
+
+
+def follow_scopes(request):
+    # Every new or changed post bumps the index; following or unfollowing
+    # bumps the author scope of the follower.
+    return (
+        feed_cache.INDEX, feed_cache.USERS,
+        feed_cache.author_scope(request.user.username),
+    )
+
+
+def follow_etag(request):
+    return feed_cache.page_digest(request, follow_scopes(request))
+
+
+def follow_last_modified(request):
+    return feed_cache.last_modified(follow_scopes(request))
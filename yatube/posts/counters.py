@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+from .utils import pk_batches
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _delta(field, delta):
+    return Greatest(F(field) + delta, 0)
+
+
+def change_user_counter(user_id, field, delta):
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: _delta(field, delta)}
+    )
+    # A missing row is recounted on the way up only: on the way down the
+    # user may be in the middle of a cascade delete.
+    if not updated and delta > 0:
+        recount_users([user_id])
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_delta('comments_count', delta)
+    )
+
+
+def _count_by(model, field, ids):
+    # Without order_by() the default ordering joins the GROUP BY.
+    rows = model.objects.filter(**{f'{field}__in': ids}).order_by().values(
+        field
+    ).annotate(total=Count('pk')).values_list(field, 'total')
+    return dict(rows)
+
+
+def recount_users(ids):
+    """Repairs author counters for the given users, returns rows fixed."""
+    actual = {
+        field: _count_by(model, lookup, ids)
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }
+    existing = AuthorStats.objects.in_bulk(ids)
+    changed, created = [], []
+    for user_id in ids:
+        values = {
+            field: counts.get(user_id, 0) for field, counts in actual.items()
+        }
+        stats = existing.get(user_id)
+        if stats is None:
+            created.append(AuthorStats(user_id=user_id, **values))
+            continue
+        if any(getattr(stats, field) != value
+               for field, value in values.items()):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            changed.append(stats)
+    AuthorStats.objects.bulk_create(created, ignore_conflicts=True)
+    AuthorStats.objects.bulk_update(changed, list(USER_COUNTERS))
+    return len(changed) + len(created)
+
+
+def recount_posts(ids):
+    """Repairs comment counters for the given posts, returns rows fixed."""
+    actual = _count_by(Comment, 'post', ids)
+    changed = []
+    for post in Post.objects.filter(pk__in=ids).only('comments_count'):
+        value = actual.get(post.pk, 0)
+        if post.comments_count != value:
+            post.comments_count = value
+            changed.append(post)
+    Post.objects.bulk_update(changed, ['comments_count'])
+    return len(changed)
+
+
+def reconcile(batch_size=BATCH_SIZE):
+    users = sum(
+        recount_users(batch)
+        for batch in pk_batches(User.objects.all(), batch_size)
+    )
+    posts = sum(
+        recount_posts(batch)
+        for batch in pk_batches(Post.objects.all(), batch_size)
+    )
+    return users, posts
@@ -0,0 +1,227 @@
+import hashlib
+import math
+import random
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+GENERATION_KEY = 'posts:generation:{}'
+MODIFIED_KEY = 'posts:modified:{}'
+PAGE_KEY = 'posts:page:{}'
+STATS_KEY = 'posts:cache:{}'
+LOCK_KEY = 'posts:lock:{}'
+EVENTS = ('hit', 'miss', 'stale')
+POLL_INTERVAL = 0.05
+INDEX = 'index'
+USERS = 'users'
+# Every generation depends on it, so bumping it invalidates all pages.
+EPOCH = 'epoch'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def tag_scope(name):
+    return f'tag:{name}'
+
+
+def mention_scope(username):
+    return f'mentions:{username}'
+
+
+def archive_scope(scope, year=None, month=None):
+    """The archive of ``scope`` as a whole, or one month of it."""
+    if year is None:
+        return f'archive:{scope}'
+    return f'archive:{scope}:{year:04}-{month:02}'
+
+
+def _initial_generation():
+    # Starting from the clock means a generation lost on eviction never
+    # comes back with a value that old pages were cached under.
+    return int(time.time() * 1000)
+
+
+def generations(scopes):
+    """Generations of ``scopes``, each prefixed with the epoch."""
+    keys = [GENERATION_KEY.format(scope) for scope in (EPOCH, *scopes)]
+    values = cache.get_many(keys)
+    for key in set(keys) - values.keys():
+        cache.add(key, _initial_generation(), None)
+        values[key] = cache.get(key)
+    epoch = values[keys[0]]
+    return [f'{epoch}.{values[key]}' for key in keys[1:]]
+
+
+def bump(*scopes):
+    scopes = set(scopes)
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+    now = int(time.time())
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None
+    )
+
+
+def last_modified(scopes):
+    keys = [MODIFIED_KEY.format(scope) for scope in (EPOCH, *scopes)]
+    values = cache.get_many(keys)
+    for key in set(keys) - values.keys():
+        cache.add(key, int(time.time()), None)
+        values[key] = cache.get(key)
+    return datetime.fromtimestamp(max(values.values()), timezone.utc)
+
+
+def _count(event):
+    key = STATS_KEY.format(event)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def stats():
+    keys = {STATS_KEY.format(event): event for event in EVENTS}
+    values = cache.get_many(keys)
+    return {event: values.get(key, 0) for key, event in keys.items()}
+
+
+def page_digest(request, scopes):
+    if not hasattr(request, '_feed_digest'):
+        user = request.user.pk if request.user.is_authenticated else ''
+        parts = [request.get_full_path(), str(user)]
+        parts.extend(str(value) for value in generations(scopes))
+        request._feed_digest = hashlib.md5(
+            '|'.join(parts).encode()
+        ).hexdigest()
+    return request._feed_digest
+
+
+def page_key(request, scopes):
+    return PAGE_KEY.format(page_digest(request, scopes))
+
+
+def _is_fresh(entry):
+    # Probabilistic early refresh: the closer the entry is to expiry and the
+    # longer it took to build, the likelier a request rebuilds it early.
+    early = entry['delta'] * settings.FEED_CACHE_EARLY_BETA * -math.log(
+        1 - random.random()
+    )
+    return time.time() + early < entry['expires']
+
+
+def _rebuild(key, build, to_value, timeout):
+    _count('miss')
+    started = time.time()
+    result = build()
+    value = to_value(result)
+    if value is not None:
+        cache.set(
+            key,
+            {
+                'value': value,
+                'expires': time.time() + timeout,
+                'delta': time.time() - started,
+            },
+            None if math.isinf(timeout)
+            else timeout + settings.FEED_CACHE_STALE_TIMEOUT
+        )
+    return value, result
+
+
+def single_flight(key, build, to_value, timeout=None):
+    """Returns ``(value, None)`` from cache or ``(value, result)`` if built.
+
+    Only the request holding the lock rebuilds an expired entry; the others
+    serve the stale copy meanwhile, or wait for the rebuild when there is no
+    copy at all. ``to_value`` turns a build result into the cached value, or
+    returns None when it must not be cached. Entries stay fresh for
+    ``timeout`` seconds, ``settings.FEED_CACHE_TIMEOUT`` by default, or
+    until evicted when it is ``math.inf``.
+    """
+    if timeout is None:
+        timeout = settings.FEED_CACHE_TIMEOUT
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry):
+        _count('hit')
+        return entry['value'], None
+    lock = LOCK_KEY.format(key)
+    if cache.add(lock, 1, settings.FEED_CACHE_LOCK_TIMEOUT):
+        try:
+            return _rebuild(key, build, to_value, timeout)
+        finally:
+            cache.delete(lock)
+    if entry is not None:
+        _count('stale')
+        return entry['value'], None
+    deadline = time.monotonic() + settings.FEED_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            _count('hit')
+            return entry['value'], None
+    return _rebuild(key, build, to_value, timeout)
+
+
+def _response_value(response):
+    if response.status_code != 200 or response.streaming:
+        return None
+    return response.content, response['Content-Type']
+
+
+def cache_feed(scopes, timeout=None):
+    """Caches a feed page until one of its scopes is bumped.
+
+    ``scopes`` receives the view kwargs and returns the generation scopes
+    the page depends on; the key changes as soon as any of them is bumped,
+    so pages can live for hours and still never be served stale. Expiry by
+    time is softened with a stale-while-revalidate window. ``timeout``, if
+    given, receives the view kwargs too and returns how long the page stays
+    fresh, see ``single_flight``.
+
+    The same generations give the page its ETag and the time of the last
+    bump its Last-Modified, so conditional requests are answered with 304
+    without touching the database.
+    """
+    def decorator(view):
+        def etag(request, *args, **kwargs):
+            return page_digest(request, scopes(**kwargs))
+
+        def modified(request, *args, **kwargs):
+            return last_modified(scopes(**kwargs))
+
+        @wraps(view)
+        @vary_on_cookie
+        @condition(etag_func=etag, last_modified_func=modified)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            value, response = single_flight(
+                page_key(request, scopes(**kwargs)),
+                lambda: view(request, *args, **kwargs),
+                _response_value,
+                timeout and timeout(**kwargs),
+            )
+            if response is not None:
+                return response
+            content, content_type = value
+            return HttpResponse(content, content_type=content_type)
+        return wrapper
+    return decorator
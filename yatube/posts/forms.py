@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -17,6 +19,23 @@ class PostForm(ModelForm):
             'group': 'Выберите группу',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the head of such a file was kept, Django's ImageField
+        # would call it broken.
+        self.oversized = uploads.too_large(self.files.get('image'))
+        if self.oversized:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.oversized:
+            raise uploads.size_error()
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            uploads.validate(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,136 @@
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageFilter
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from . import feed_cache
+from .models import Post
+from .utils import pk_batches
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+SAMPLE_SIZE = (64, 64)
+PLACEHOLDER_SIZE = (16, 16)
+PALETTE_SIZE = 5
+METADATA_FIELDS = ('image_color', 'image_placeholder')
+EMPTY_METADATA = dict.fromkeys(METADATA_FIELDS, '')
+
+
+def _dominant_color(sample):
+    palette = sample.quantize(PALETTE_SIZE)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def _placeholder(sample):
+    tiny = sample.copy()
+    tiny.thumbnail(PLACEHOLDER_SIZE)
+    tiny = tiny.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    tiny.save(buffer, 'JPEG', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def summarize(image):
+    """Metadata of an opened Pillow image, which is shrunk in place."""
+    image.thumbnail(SAMPLE_SIZE)
+    sample = image.convert('RGB')
+    return {
+        'image_color': _dominant_color(sample),
+        'image_placeholder': _placeholder(sample),
+    }
+
+
+def describe(image):
+    """Dominant colour and a blurred data-URI preview of ``image``.
+
+    Uploads checked by ``uploads.validate`` already carry it. Returns None
+    if the file cannot be read as an image.
+    """
+    if not image._committed:
+        verified = getattr(image.file, 'image_metadata', None)
+        if verified:
+            return verified
+    try:
+        closed = image.closed
+        image.open()
+        try:
+            with Image.open(image) as source:
+                metadata = summarize(source)
+        finally:
+            if closed:
+                image.close()
+            else:
+                image.seek(0)
+    except (OSError, SuspiciousOperation, ValueError):
+        logger.warning('Could not read image %s', image.name, exc_info=True)
+        return None
+    return metadata
+
+
+def backfill(workers=None, batch_size=BATCH_SIZE):
+    """Fills image metadata of older posts, decoding images in parallel.
+
+    Returns how many posts were filled and how many images failed.
+    """
+    queryset = Post.objects.exclude(image='').filter(image_placeholder='')
+    filled = failed = 0
+    with ThreadPoolExecutor(workers) as pool:
+        for batch in pk_batches(queryset, batch_size):
+            posts = list(Post.objects.filter(pk__in=batch))
+            changed = []
+            for post, metadata in zip(
+                posts, pool.map(lambda post: describe(post.image), posts)
+            ):
+                if metadata is None:
+                    failed += 1
+                    continue
+                for field, value in metadata.items():
+                    setattr(post, field, value)
+                post.updated = timezone.now()
+                changed.append(post)
+            Post.objects.bulk_update(changed, METADATA_FIELDS + ('updated',))
+            filled += len(changed)
+    if filled:
+        # Cached cards and pages do not have the new attributes yet.
+        feed_cache.bump(feed_cache.INDEX, feed_cache.USERS)
+    return filled, failed
+
+
+def release(image):
+    """Drops a reference to a stored image once the transaction commits.
+
+    Identical uploads share one file, so the file and its thumbnails are
+    deleted only when no post refers to it any more. A file touched within
+    ``MEDIA_GC_GRACE_PERIOD`` may be an upload of the same bytes whose post
+    is not committed yet; it is left to ``collect_media``.
+    """
+    if image:
+        transaction.on_commit(lambda: _delete_unused(str(image)))
+
+
+def _delete_unused(name):
+    if Post.objects.filter(image=name).exists():
+        return
+    storage = Post._meta.get_field('image').storage
+    try:
+        age = timezone.now() - storage.get_modified_time(name)
+        if age.total_seconds() < settings.MEDIA_GC_GRACE_PERIOD:
+            return
+        default.kvstore.delete(ImageFile(name, storage))
+        storage.delete(name)
+    except (OSError, SuspiciousOperation):
+        logger.exception('Could not delete unused image %s', name)
+    else:
+        logger.info('Deleted unused image %s', name)
@@ -0,0 +1,46 @@
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """sorl-thumbnail's cached DB store that can also look up in bulk."""
+
+    def get_many(self, image_files):
+        """Maps the key of each of ``image_files`` to its thumbnail or None.
+
+        Costs one cache round trip, plus one query for the keys that are
+        not cached yet.
+        """
+        keys = {add_prefix(image_file.key): image_file
+                for image_file in image_files}
+        values = self.cache.get_many(keys)
+        missing = keys.keys() - values.keys()
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            found = {
+                key: stored.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(found, settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(found)
+        return {
+            image_file.key: self._load(values[key])
+            for key, image_file in keys.items()
+        }
+
+    def delete_many(self, image_files):
+        """Forgets ``image_files`` in one query, leaving the files alone."""
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        KVStoreModel.objects.filter(key__in=keys).delete()
+        self.cache.delete_many(keys)
+
+    @staticmethod
+    def _load(value):
+        if not value or value == cached_db_kvstore.EMPTY_VALUE:
+            return None
+        return deserialize_image_file(value)
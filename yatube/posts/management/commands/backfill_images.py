@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, основной цвет и размытое превью картинок '
+        'у постов, сохранённых до появления этих полей. Картинки '
+        'декодируются в нескольких потоках.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument(
+            '--batch-size', type=int, default=images.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        filled, failed = images.backfill(
+            options['workers'], options['batch_size']
+        )
+        self.stdout.write(
+            f'Заполнено постов: {filled}, не удалось прочитать: {failed}'
+        )
@@ -0,0 +1,67 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from posts.models import Group, Post
+from posts.utils import get_paginator
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время рендера страницы ленты с холодным и прогретым '
+        'кэшем карточек постов. Данные создаются в транзакции и '
+        'откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.populate(options['posts'])
+            request = RequestFactory().get('/')
+            request.user = AnonymousUser()
+            cold = self.measure(request, options['rounds'], warm=False)
+            warm = self.measure(request, options['rounds'], warm=True)
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'cold: {cold * 1000:.2f}ms/page  warm: {warm * 1000:.2f}ms/page '
+            f'({settings.POSTS_PER_PAGE} posts per page)'
+        )
+
+    def measure(self, request, rounds, warm):
+        total = 0
+        page_obj = list(get_paginator(
+            request, Post.objects.select_related('group', 'author')
+        ))
+        for _ in range(rounds):
+            if not warm:
+                cache.clear()
+            started = perf_counter()
+            render_to_string(
+                'posts/index.html', {'page_obj': page_obj}, request
+            )
+            total += perf_counter() - started
+        return total / rounds
+
+    def populate(self, count):
+        author = User.objects.create(
+            username='bench_cards', first_name='Bench', last_name='Author'
+        )
+        group = Group.objects.create(
+            title='Bench', slug='bench-cards', description='Bench'
+        )
+        text = 'Строка текста поста\n' * 20
+        Post.objects.bulk_create(
+            Post(text=text, author=author, group=group) for _ in range(count)
+        )
@@ -0,0 +1,106 @@
+import random
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from posts import counters, timeline
+from posts.models import Follow, Post, Timeline
+
+User = get_user_model()
+
+DISTRIBUTIONS = ('uniform', 'skewed')
+STRATEGIES = {
+    'push': 10 ** 12,
+    'hybrid': None,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запись в ленты (fan-out) и время чтения ленты подписок '
+        'для чистого push и гибридной стратегии. Данные создаются в '
+        'транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=2000)
+        parser.add_argument('--authors', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5)
+        parser.add_argument('--reads', type=int, default=50)
+        parser.add_argument(
+            '--threshold', type=int,
+            default=settings.FEED_CELEBRITY_FOLLOWERS
+        )
+
+    def handle(self, *args, **options):
+        for distribution in DISTRIBUTIONS:
+            for strategy, threshold in STRATEGIES.items():
+                with override_settings(
+                    FEED_CELEBRITY_FOLLOWERS=threshold or options['threshold']
+                ):
+                    result = self.run(distribution, options)
+                self.stdout.write(
+                    f'{distribution:8} {strategy:7} '
+                    f'entries/post={result["amplification"]:10.1f} '
+                    f'write={result["write_ms"]:8.2f}ms/post '
+                    f'read={result["read_ms"]:7.2f}ms/page'
+                )
+
+    def run(self, distribution, options):
+        with transaction.atomic():
+            cache.delete(timeline.CELEBRITIES_CACHE_KEY)
+            authors, followers = self.populate(distribution, options)
+            written_before = Timeline.objects.count()
+            started = perf_counter()
+            for _ in range(options['posts']):
+                for author in authors:
+                    Post.objects.create(text='bench', author=author)
+            write_time = perf_counter() - started
+            written = Timeline.objects.count() - written_before
+            posts = options['posts'] * len(authors)
+
+            readers = random.sample(
+                followers, min(options['reads'], len(followers))
+            )
+            started = perf_counter()
+            for reader in readers:
+                list(timeline.feed_for(reader)[:settings.POSTS_PER_PAGE])
+            read_time = perf_counter() - started
+            transaction.set_rollback(True)
+        return {
+            'amplification': written / posts,
+            'write_ms': write_time * 1000 / posts,
+            'read_ms': read_time * 1000 / max(len(readers), 1),
+        }
+
+    def populate(self, distribution, options):
+        User.objects.bulk_create(
+            User(username=f'bench_author_{number}')
+            for number in range(options['authors'])
+        )
+        User.objects.bulk_create(
+            User(username=f'bench_follower_{number}')
+            for number in range(options['followers'])
+        )
+        authors = list(User.objects.filter(username__startswith='bench_a'))
+        followers = list(
+            User.objects.filter(username__startswith='bench_f')
+        )
+        follows = []
+        for follower in followers:
+            if distribution == 'uniform':
+                followed = random.sample(authors, min(3, len(authors)))
+            else:
+                followed = [authors[0]] + random.sample(authors[1:], 2)
+            follows.extend(
+                Follow(user=follower, author=author) for author in followed
+            )
+        Follow.objects.bulk_create(follows)
+        counters.recount_users([author.pk for author in authors])
+        timeline.update_celebrities()
+        return authors, followers
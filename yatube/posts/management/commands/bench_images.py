@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+# Viewport width and image types each client accepts besides the fallback.
+CLIENTS = {
+    'desktop': (960, ('image/avif', 'image/webp')),
+    'mobile': (480, ('image/avif', 'image/webp')),
+    'legacy': (960, ()),
+}
+
+
+def photo(number):
+    noise = Image.effect_noise((1600, 1200), 40 + number % 30)
+    gradient = Image.linear_gradient('L').resize((1600, 1200))
+    image = Image.merge('RGB', (noise, gradient, noise.transpose(
+        Image.FLIP_LEFT_RIGHT
+    )))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return ContentFile(buffer.getvalue(), name=f'bench_{number}.jpg')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает объём изображений на странице ленты до и после '
+        'адаптивных вариантов (ширины и форматы). Данные создаются во '
+        'временном каталоге и транзакции и удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=settings.POSTS_PER_PAGE
+        )
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root), \
+                    transaction.atomic():
+                images = self.populate(options['posts'])
+                before = sum(self.single_crop(image) for image in images)
+                after = {
+                    client: sum(
+                        self.chosen(image, width, accepted)
+                        for image in images
+                    )
+                    for client, (width, accepted) in CLIENTS.items()
+                }
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        self.stdout.write(
+            f'до: {before / 1024:.1f} KiB на {len(images)} изображений'
+        )
+        for client, size in after.items():
+            self.stdout.write(
+                f'после, {client:8}: {size / 1024:.1f} KiB '
+                f'({size / before:.0%})'
+            )
+
+    def populate(self, count):
+        author = User.objects.create(username='bench_images')
+        return [
+            Post.objects.create(
+                text='Пост', author=author, image=photo(number)
+            ).image.name
+            for number in range(count)
+        ]
+
+    def single_crop(self, image):
+        thumbnail = get_thumbnail(
+            thumbnails.source(image), '960x339', crop='center', upscale=True
+        )
+        return default.storage.size(thumbnail.name)
+
+    def chosen(self, image, width, accepted):
+        """Bytes a browser downloads for the card picture of ``image``."""
+        thumbnails.generate(image)
+        files = thumbnails.ready(image, 'card').files
+        formats = [variant.format for variant, _ in files]
+        format_ = next(
+            (format_ for format_ in formats
+             if thumbnails.MIME_TYPES[format_] in accepted),
+            formats[-1]
+        )
+        candidates = [
+            (variant.width, thumbnail) for variant, thumbnail in files
+            if variant.format == format_
+        ]
+        thumbnail = next(
+            (thumbnail for size, thumbnail in candidates if size >= width),
+            candidates[-1][1]
+        )
+        return default.storage.size(thumbnail.name)
@@ -0,0 +1,83 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.test import RequestFactory
+
+from posts import page_counts
+from posts.models import Post
+from posts.utils import get_paginator
+
+User = get_user_model()
+
+# The paginator include as it was: one link per page.
+FULL_RANGE = Template(
+    '{% for i in page_obj.paginator.page_range %}'
+    '<li class="page-item"><a class="page-link" href="?page={{ i }}">'
+    '{{ i }}</a></li>{% endfor %}'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер HTML пагинатора и время построения страницы '
+        'ленты с полным и сокращённым списком страниц на большом числе '
+        'постов. Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.populate(options['posts'])
+            queryset = Post.objects.select_related('group', 'author')
+            last = -(-options['posts'] // settings.POSTS_PER_PAGE)
+            for number in (1, settings.POSTS_MAX_PAGE, last):
+                before = self.measure(
+                    lambda: self.full(queryset, number), options['rounds']
+                )
+                after = self.measure(
+                    lambda: self.elided(queryset, number), options['rounds']
+                )
+                for name, (size, elapsed) in (
+                    ('до', before), ('после', after)
+                ):
+                    self.stdout.write(
+                        f'page={number:<6} {name:6} '
+                        f'{size / 1024:8.1f} KiB {elapsed * 1000:8.2f}ms'
+                    )
+            transaction.set_rollback(True)
+
+    def populate(self, count):
+        author = User.objects.create(username='bench_pagination')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=author)
+            for number in range(count)
+        )
+
+    def measure(self, render, rounds):
+        started = perf_counter()
+        for _ in range(rounds):
+            html = render()
+        return len(html.encode()), (perf_counter() - started) / rounds
+
+    def full(self, queryset, number):
+        page_obj = Paginator(queryset, settings.POSTS_PER_PAGE).get_page(
+            number
+        )
+        list(page_obj)
+        return FULL_RANGE.render(Context({'page_obj': page_obj}))
+
+    def elided(self, queryset, number):
+        request = RequestFactory().get('/', {'page': number})
+        page_obj = get_paginator(request, queryset, page_counts.index)
+        return get_template('posts/includes/paginator.html').render(
+            {'page_obj': page_obj}
+        )
@@ -0,0 +1,97 @@
+import itertools
+import random
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+SYLLABLES = [
+    consonant + vowel
+    for consonant, vowel in itertools.product('бвгдзклмнпрстх', 'аеиоу')
+]
+ENDINGS = ('', 'а', 'у', 'ом', 'е', 'ы', 'ами', 'ах', 'ов')
+VOCABULARY = 20000
+# Ranks of the query words: very common, common, rare.
+QUERY_RANKS = (3, 300, 10000)
+ADMIN_PAGE = 100
+
+
+def vocabulary(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по постам через ICONTAINS (как в админке) с '
+        'поиском по индексу на текстах с частотами слов по закону Ципфа. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--words', type=int, default=60)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['posts'])
+        words = vocabulary(rng)
+        with transaction.atomic():
+            self.populate(rng, words, options['posts'], options['words'])
+            queries = [words[rank] + 'ами' for rank in QUERY_RANKS]
+            queries.append(f'{words[QUERY_RANKS[0]]} {words[QUERY_RANKS[1]]}')
+            for query in queries:
+                self.compare(query, options['rounds'])
+            transaction.set_rollback(True)
+
+    def populate(self, rng, words, count, length):
+        author = User.objects.create(username='bench_search')
+        weights = [1 / rank for rank in range(1, len(words) + 1)]
+        Post.objects.bulk_create(
+            Post(text=' '.join(
+                word + rng.choice(ENDINGS)
+                for word in rng.choices(words, weights, k=length)
+            ), author=author)
+            for _ in range(count)
+        )
+        started = perf_counter()
+        search.rebuild()
+        self.stdout.write(
+            f'индекс {count} постов: {perf_counter() - started:.1f}s'
+        )
+
+    def compare(self, query, rounds):
+        like = Post.objects.all()
+        for word in query.split():
+            like = like.filter(text__icontains=word)
+        indexed = search.matching(Post.objects.all(), query)
+        timings = (
+            ('страница', lambda: list(like[:settings.POSTS_PER_PAGE]),
+             lambda: search.search(query)),
+            ('админка', lambda: (like.count(), list(like[:ADMIN_PAGE])),
+             lambda: (indexed.count(), list(indexed[:ADMIN_PAGE]))),
+        )
+        self.stdout.write(
+            f'{query!r}: icontains находит {like.count()}, '
+            f'индекс {indexed.count()}'
+        )
+        for name, before, after in timings:
+            self.stdout.write(
+                f'  {name:9} icontains: {self.measure(before, rounds):8.2f}ms'
+                f'  индекс: {self.measure(after, rounds):8.2f}ms'
+            )
+
+    def measure(self, run, rounds):
+        started = perf_counter()
+        for _ in range(rounds):
+            run()
+        return (perf_counter() - started) / rounds * 1000
@@ -0,0 +1,134 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from time import perf_counter
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import load_handler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.tests.utils import png_bomb
+
+DJANGO_HANDLERS = (
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+)
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def resident():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE
+
+
+class Peak(threading.Thread):
+    """Samples the resident set size until stopped."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.baseline = self.peak = resident()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(0.005):
+            self.peak = max(self.peak, resident())
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        return self.peak - self.baseline
+
+
+def photo(megapixels, number):
+    width = int((megapixels * 10 ** 6 * 4 / 3) ** 0.5)
+    size = (width, width * 3 // 4)
+    noise = Image.effect_noise(size, 20 + number % 30)
+    gradient = Image.linear_gradient('L').resize(size)
+    image = Image.merge('RGB', (gradient, noise, gradient))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def legacy(file):
+    """Django's ImageField check, then the full decode saving used to do."""
+    file = forms.ImageField().clean(file)
+    with Image.open(file) as image:
+        image.convert('RGB')
+
+
+def streamed(file):
+    form = PostForm({'text': 'Пост'}, {'image': file})
+    if not form.is_valid():
+        raise ValidationError(form.errors)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает много больших изображений и «бомб» одновременно и '
+        'сравнивает пиковую память процесса при обычной обработке Django '
+        'и при потоковой загрузке с проверкой в пуле.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=16)
+        parser.add_argument('--bombs', type=int, default=4)
+        parser.add_argument('--megapixels', type=float, default=12)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        images = [
+            (f'photo_{number}.jpg', photo(options['megapixels'], number))
+            for number in range(options['uploads'])
+        ] + [
+            (f'bomb_{number}.png', png_bomb(10000, 6000))
+            for number in range(options['bombs'])
+        ]
+        self.stdout.write(
+            f'{len(images)} файлов, '
+            f'{sum(len(data) for _, data in images) / 2 ** 20:.1f} MiB'
+        )
+        for name, handlers, validate in (
+            ('до', DJANGO_HANDLERS, legacy),
+            ('после', None, streamed),
+        ):
+            self.run(name, images, handlers, validate, options)
+
+    def run(self, name, images, handlers, validate, options):
+        factory = RequestFactory()
+        requests = [
+            factory.post('/create/', {
+                'text': 'Пост',
+                'image': SimpleUploadedFile(filename, data, 'image/jpeg'),
+            })
+            for filename, data in images
+        ]
+
+        def upload(request):
+            if handlers:
+                request.upload_handlers = [
+                    load_handler(handler, request) for handler in handlers
+                ]
+            try:
+                validate(request.FILES['image'])
+            except ValidationError:
+                return False
+            return True
+
+        peak = Peak()
+        peak.start()
+        started = perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            accepted = sum(pool.map(upload, requests))
+        elapsed = perf_counter() - started
+        grown = peak.stop()
+        self.stdout.write(
+            f'{name:6} пик памяти: +{grown / 2 ** 20:7.1f} MiB  '
+            f'принято: {accepted}/{len(requests)}  время: {elapsed:.2f}s'
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import orphans
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки и миниатюры, на которые не ссылается ни один '
+        'пост, вместе с их записями в хранилище миниатюр. Файлы моложе '
+        '--grace секунд не трогает.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=None)
+        parser.add_argument(
+            '--batch-size', type=int, default=orphans.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько файлов было бы удалено'
+        )
+
+    def handle(self, *args, **options):
+        collector = orphans.Collector(
+            options['grace'], options['batch_size'], options['dry_run']
+        )
+        counts = collector.run()
+        prefix = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}: картинок {counts["images"]}, '
+            f'миниатюр {counts["thumbnails"]}, '
+            f'записей хранилища {counts["entries"]}, '
+            f'{collector.freed / 2 ** 20:.1f} MiB'
+        ))
@@ -0,0 +1,150 @@
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache, thumbnails
+from posts.models import Post
+from posts.utils import pk_batches
+
+CHECKPOINT = os.path.join(settings.BASE_DIR, '.thumbnails_checkpoint')
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры картинок всех постов в нескольких '
+        'процессах, пачками по id. Прогресс сохраняется, прерванный запуск '
+        'продолжается с места остановки, пока не изменятся настройки '
+        'миниатюр. С --processes 1 работает без пула процессов, с --force '
+        'пересоздаёт записи о всех миниатюрах, например после переезда '
+        'на другое хранилище.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count()
+        )
+        parser.add_argument('--chunk-size', type=int, default=50)
+        parser.add_argument('--checkpoint', default=CHECKPOINT)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с первого поста, не глядя на сохранённый прогресс'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Забыть записи о готовых миниатюрах и создать их заново'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать картинки без миниатюр'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.started = perf_counter()
+        self.posts = self.images = self.failed = 0
+        last_id = 0 if options['restart'] else self.load_checkpoint()
+        queryset = Post.objects.exclude(image='').filter(pk__gt=last_id)
+        self.total = queryset.count()
+        if last_id:
+            self.stdout.write(f'Продолжаем после поста {last_id}')
+        chunks = self.chunks(queryset)
+        if options['dry_run']:
+            for last, posts, images in chunks:
+                self.finish(last, posts, images, [])
+        elif options['processes'] <= 1:
+            for last, posts, images in chunks:
+                self.finish(
+                    last, posts, images, thumbnails.generate_many(images)
+                )
+        else:
+            self.run_pool(chunks)
+        if self.images and not options['dry_run']:
+            feed_cache.bump(feed_cache.INDEX, feed_cache.USERS)
+        verb = 'без миниатюр' if options['dry_run'] else 'обработано'
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: постов {self.posts}, картинок {verb} {self.images}, '
+            f'ошибок {self.failed}, {self.rate():.1f} изобр./с'
+        ))
+
+    def chunks(self, queryset):
+        for batch in pk_batches(queryset, self.options['chunk_size']):
+            names = Post.objects.filter(pk__in=batch).values_list(
+                'image', flat=True
+            )
+            images = set(names)
+            if not self.options['force']:
+                images = thumbnails.pending(images)
+            elif not self.options['dry_run']:
+                thumbnails.forget(images)
+            yield batch[-1], len(batch), list(images)
+
+    def run_pool(self, chunks):
+        processes = self.options['processes']
+        # Spawned processes set Django up from scratch instead of sharing
+        # the database connections of this one.
+        with ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        ) as pool:
+            in_flight = deque()
+            for last, posts, images in chunks:
+                in_flight.append((
+                    last, posts, images,
+                    pool.submit(thumbnails.generate_many, images)
+                ))
+                if len(in_flight) >= processes * 2:
+                    self.collect(in_flight.popleft())
+            while in_flight:
+                self.collect(in_flight.popleft())
+
+    def collect(self, job):
+        last, posts, images, future = job
+        self.finish(last, posts, images, future.result())
+
+    def finish(self, last, posts, images, failed):
+        """Chunks finish in id order, so the checkpoint never skips one."""
+        self.posts += posts
+        self.images += len(images)
+        self.failed += len(failed)
+        if not self.options['dry_run']:
+            self.save_checkpoint(last)
+        self.stdout.write(
+            f'{self.posts}/{self.total} постов, '
+            f'{self.images} картинок, {self.rate():.1f} изобр./с'
+        )
+
+    def rate(self):
+        return self.images / (perf_counter() - self.started)
+
+    def load_checkpoint(self):
+        try:
+            with open(self.options['checkpoint']) as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        if checkpoint.get('signature') != thumbnails.signature():
+            return 0
+        if checkpoint.get('force', False) != self.options['force']:
+            return 0
+        return checkpoint.get('last_id', 0)
+
+    def save_checkpoint(self, last_id):
+        path = self.options['checkpoint']
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(
+                {
+                    'signature': thumbnails.signature(),
+                    'force': self.options['force'],
+                    'last_id': last_id,
+                },
+                file
+            )
+        os.replace(f'{path}.tmp', path)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает поисковый индекс постов, например после массовых '
+        'изменений в обход сигналов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=search.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = search.rebuild(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов: {indexed}')
+        )
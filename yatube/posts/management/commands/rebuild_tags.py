@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново разбирает теги и упоминания всех постов, например после '
+        'массовых изменений в обход сигналов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=tags.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = tags.rebuild(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Разобрано постов: {indexed}')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters, timeline
+
+
+class Command(BaseCommand):
+    help = 'Исправляет расхождения в счётчиках постов, комментариев и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=counters.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        users, posts = counters.reconcile(options['batch_size'])
+        celebrities = timeline.update_celebrities()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Исправлено авторов: {users}, постов: {posts}, '
+                f'знаменитостей: {celebrities}'
+            )
+        )
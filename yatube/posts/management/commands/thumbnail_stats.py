@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает очередь фоновой генерации миниатюр и среднее время '
+        'от загрузки изображения до готовности миниатюр.'
+    )
+
+    def handle(self, *args, **options):
+        stats = thumbnails.stats()
+        self.stdout.write(
+            f'в очереди: {stats["queue"]}  '
+            f'готово: {stats["generated"]}  '
+            f'ошибок: {stats["failed"]}  '
+            f'ожидание: {stats["latency"]:.0f}ms  '
+            f'генерация: {stats["render"]:.0f}ms'
+        )
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+from posts.search.stemmer import stems
+from posts.utils import batches
+
+BATCH_SIZE = 500
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE posts_search USING fts5("
+            "body, tokenize = 'unicode61 remove_diacritics 0')"
+        )
+        posts = Post.objects.order_by().values_list('pk', 'text')
+        for batch in batches(posts.iterator(), BATCH_SIZE):
+            cursor.executemany(
+                'INSERT INTO posts_search (rowid, body) VALUES (%s, %s)',
+                [(pk, ' '.join(stems(text))) for pk, text in batch]
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_image_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.tags import parse_mentions, parse_tags
+
+
+def fill_index(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    PostTag = apps.get_model('posts', 'PostTag')
+    Mention = apps.get_model('posts', 'Mention')
+    users = dict(User.objects.values_list('username', 'pk'))
+    tags = {}
+    post_tags, mentions = [], []
+    for pk, text, pub_date in Post.objects.values_list(
+        'pk', 'text', 'pub_date'
+    ).iterator():
+        for name in parse_tags(text):
+            if name not in tags:
+                tags[name] = Tag.objects.create(name=name).pk
+            post_tags.append(
+                PostTag(post_id=pk, tag_id=tags[name], pub_date=pub_date)
+            )
+        mentions += [
+            Mention(post_id=pk, user_id=users[username], pub_date=pub_date)
+            for username in parse_mentions(text) if username in users
+        ]
+    PostTag.objects.bulk_create(post_tags, batch_size=500)
+    Mention.objects.bulk_create(mentions, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Post', verbose_name='Публикация')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Tag', verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Тег поста',
+                'verbose_name_plural': 'Теги постов',
+                'ordering': ['-pub_date', '-post'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.Post', verbose_name='Публикация')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL, verbose_name='Упомянутый пользователь')),
+            ],
+            options={
+                'verbose_name': 'Упоминание',
+                'verbose_name_plural': 'Упоминания',
+                'ordering': ['-pub_date', '-post'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-pub_date', '-post'], name='posttag_tag_date_post_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('post', 'tag'), name='unique_post_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='mention',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='mention_user_date_post_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mention',
+            constraint=models.UniqueConstraint(fields=('post', 'user'), name='unique_mention'),
+        ),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:47
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_celebrities(apps, schema_editor):
+    # Nobody knows since when their posts were not pushed, so all of them
+    # are pushed when they drop below the threshold.
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers_count__gte=settings.FEED_CELEBRITY_FOLLOWERS
+    ).update(celebrity_since=datetime(1970, 1, 1, tzinfo=timezone.utc))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='celebrity_since',
+            field=models.DateTimeField(blank=True, editable=False, help_text='С этого момента посты автора не рассылаются подписчикам', null=True, verbose_name='Знаменитость с'),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import HashedStorage
+
 User = get_user_model()
 
 
@@ -13,6 +15,10 @@ class Post(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     group = models.ForeignKey(
         'Group',
         blank=True, null=True,
@@ -30,13 +36,44 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=HashedStorage(),
         blank=True
     )
+    image_color = models.CharField(
+        'Основной цвет картинки',
+        max_length=7,
+        blank=True,
+        editable=False
+    )
+    image_placeholder = models.TextField(
+        'Размытое превью картинки',
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_date_idx'),
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='post_group_date_idx'),
+            models.Index(
+                fields=('pub_date', 'id'),
+                name='post_date_id_idx'),
+            models.Index(
+                fields=('image',),
+                name='post_image_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -71,8 +108,14 @@ class Comment(models.Model):
     )
 
     class Meta:
+        ordering = ['created', 'id']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -105,3 +148,159 @@ class Follow(models.Model):
                 name='author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx'),
+        ]
+
+
+class Timeline(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Публикация',
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_date_post_idx'),
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Тег'
+    )
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Публикация',
+        related_name='post_tags'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        verbose_name='Тег',
+        related_name='post_tags'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'tag'),
+                name='unique_post_tag'),
+        ]
+        indexes = [
+            models.Index(
+                fields=('tag', '-pub_date', '-post'),
+                name='posttag_tag_date_post_idx'),
+        ]
+
+
+class Mention(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Публикация',
+        related_name='mentions'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Упомянутый пользователь',
+        related_name='mentions'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        verbose_name = 'Упоминание'
+        verbose_name_plural = 'Упоминания'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'user'),
+                name='unique_mention'),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='mention_user_date_post_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        db_index=True
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0
+    )
+    celebrity_since = models.DateTimeField(
+        'Знаменитость с',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='С этого момента посты автора не рассылаются подписчикам'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return str(self.user_id)
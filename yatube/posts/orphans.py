@@ -0,0 +1,169 @@
+"""Deletes media files that no post refers to any more.
+
+``images.release`` deletes files as posts change, but whatever it misses
+(a crash between the commit and the delete, thumbnails whose store
+entries were lost, originals from before hashed names) stays on disk
+forever. The collector loads the names in use into sets once, walks the
+media directories comparing against them, and deletes orphans in
+batches. Files younger than the grace period are left alone: they may
+belong to a post that is still being saved.
+"""
+import json
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .models import Post
+from .utils import batches
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _storage():
+    return Post._meta.get_field('image').storage
+
+
+def referenced_images():
+    return set(
+        Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).iterator()
+    )
+
+
+def _rows(identity):
+    return KVStoreModel.objects.filter(
+        key__startswith=add_prefix('', identity)
+    ).values_list('key', 'value').iterator()
+
+
+def thumbnail_index():
+    """Names of sources in the key-value store mapped to their thumbnails."""
+    names = {
+        del_prefix(key): json.loads(value)['name']
+        for key, value in _rows('image')
+    }
+    return {
+        names.get(del_prefix(key)): [
+            names[thumbnail] for thumbnail in json.loads(value)
+            if thumbnail in names
+        ]
+        for key, value in _rows('thumbnails')
+    }
+
+
+def _walk(storage, directory):
+    """Yields name, size and age of every file under ``directory``."""
+    now = time.time()
+    root = storage.path(directory)
+    for path, _, files in os.walk(root):
+        for filename in files:
+            full_path = os.path.join(path, filename)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            name = os.path.relpath(full_path, storage.location)
+            yield (
+                name.replace(os.sep, '/'), stat.st_size, now - stat.st_mtime
+            )
+
+
+def _unreferenced(names):
+    """Drops the names a post started to use since the sets were loaded."""
+    in_use = set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    return [name for name in names if name not in in_use]
+
+
+def _delete(storage, name, forget=False, keep_file=False):
+    """Deletes a file; ``forget`` drops its store entries and thumbnails."""
+    try:
+        if forget:
+            default.kvstore.delete(ImageFile(name, storage))
+        if not keep_file:
+            storage.delete(name)
+    except (OSError, SuspiciousOperation):
+        logger.exception('Could not delete orphaned %s', name)
+        return False
+    return True
+
+
+class Collector:
+    """One pass over the media directories; counts what it deleted.
+
+    Originals are compared with the names posts use, thumbnails with the
+    ones listed in the key-value store.
+    """
+
+    def __init__(self, grace_period=None, batch_size=BATCH_SIZE,
+                 dry_run=False):
+        if grace_period is None:
+            grace_period = settings.MEDIA_GC_GRACE_PERIOD
+        self.grace_period = grace_period
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.counts = dict.fromkeys(('images', 'thumbnails', 'entries'), 0)
+        self.freed = 0
+
+    def run(self):
+        storage = _storage()
+        referenced = referenced_images()
+        index = thumbnail_index()
+        # Thumbnails of unused originals go with the original, so they
+        # wait out its grace period too.
+        listed = {
+            thumbnail for thumbnails in index.values()
+            for thumbnail in thumbnails
+        }
+        self.collect_entries(storage, [
+            source for source in index
+            if source and source not in referenced
+            and not storage.exists(source)
+        ])
+        directory = Post._meta.get_field('image').upload_to
+        self.collect_files(
+            storage, directory, referenced, 'images', recheck=True
+        )
+        self.collect_files(
+            default.storage, sorl_settings.THUMBNAIL_PREFIX, listed,
+            'thumbnails'
+        )
+        return self.counts
+
+    def collect_entries(self, storage, sources):
+        """Entries of sources that are gone from disk, with thumbnails.
+
+        Entries of orphans still on disk go with the file once its grace
+        period is over.
+        """
+        for batch in batches(sources, self.batch_size):
+            for name in _unreferenced(batch):
+                if self.dry_run or _delete(
+                    storage, name, forget=True, keep_file=True
+                ):
+                    self.counts['entries'] += 1
+
+    def collect_files(self, storage, directory, keep, kind, recheck=False):
+        orphans = (
+            (name, size) for name, size, age in _walk(storage, directory)
+            if name not in keep and age > self.grace_period
+        )
+        for batch in batches(orphans, self.batch_size):
+            sizes = dict(batch)
+            names = _unreferenced(list(sizes)) if recheck else list(sizes)
+            for name in names:
+                if self.dry_run or _delete(storage, name, forget=recheck):
+                    self.counts[kind] += 1
+                    self.freed += sizes[name]
@@ -0,0 +1,80 @@
+"""Post totals for feed paginators without a COUNT(*) per request.
+
+Author pages use the maintained ``AuthorStats.posts_count`` and follow
+feeds add it up over the followed authors. The index and group pages,
+which have no counter, are counted once per feed cache generation, so a
+new or deleted post recounts them, and a count is trusted for
+``settings.POST_COUNT_TIMEOUT`` seconds at most, which bounds staleness
+after writes that send no signals. Counting stops at
+``settings.POST_COUNT_ESTIMATE_THRESHOLD`` rows; past that the index uses
+the table estimate of the database and the group pages report the
+threshold.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max, Sum
+
+from . import feed_cache
+from .models import AuthorStats, Post
+
+COUNT_KEY = 'posts:count:{}:{}'
+
+
+STATISTICS = {
+    'postgresql': 'SELECT reltuples FROM pg_class WHERE relname = %s',
+    'mysql': (
+        'SELECT table_rows FROM information_schema.tables '
+        'WHERE table_schema = DATABASE() AND table_name = %s'
+    ),
+}
+
+
+def table_estimate():
+    """Rows in the post table, from statistics rather than a scan."""
+    sql = STATISTICS.get(connection.vendor)
+    if sql:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [Post._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] and row[0] > 0:
+            return int(row[0])
+    # Ids only grow, so the largest one bounds the count from above.
+    return Post.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def _bounded_count(queryset, estimate):
+    threshold = settings.POST_COUNT_ESTIMATE_THRESHOLD
+    count = queryset.order_by()[:threshold + 1].count()
+    if count <= threshold:
+        return count
+    return estimate() if estimate else threshold
+
+
+def _cached(scope, queryset, estimate=None):
+    generation, = feed_cache.generations([scope])
+    key = COUNT_KEY.format(scope, generation)
+    count = cache.get(key)
+    if count is None:
+        count = _bounded_count(queryset, estimate)
+        cache.set(key, count, settings.POST_COUNT_TIMEOUT)
+    return count
+
+
+def index():
+    return _cached(feed_cache.INDEX, Post.objects.all(), table_estimate)
+
+
+def group(group):
+    return _cached(feed_cache.group_scope(group.slug), group.posts.all())
+
+
+def author(user):
+    """Best called with ``stats`` selected along with the user."""
+    return user.stats.posts_count
+
+
+def feed(user):
+    return AuthorStats.objects.filter(
+        user__following__user=user
+    ).aggregate(total=Sum('posts_count'))['total'] or 0
@@ -0,0 +1,88 @@
+"""Full-text search over posts.
+
+The index lives behind a backend chosen by ``settings.POSTS_SEARCH_BACKEND``
+and is kept in step with posts by signals; ``rebuild`` refills it after
+bulk changes that bypass them. Results are ranked and paginated by a
+keyset of (rank, id), so deep result pages cost as much as the first one.
+"""
+import base64
+import binascii
+import math
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..models import Post
+from ..utils import (CURSOR_PARAM, CURSOR_SEPARATOR, CursorPage, parse_id,
+                     pk_batches)
+
+QUERY_PARAM = 'q'
+BATCH_SIZE = 500
+
+
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+def index(posts):
+    get_backend().index(posts)
+
+
+def remove(ids):
+    get_backend().remove(ids)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Indexes every post anew, returns how many there are."""
+    backend = get_backend()
+    backend.clear()
+    indexed = 0
+    for batch in pk_batches(Post.objects.all(), batch_size):
+        posts = Post.objects.filter(pk__in=batch).only('text')
+        backend.index(posts)
+        indexed += len(batch)
+    return indexed
+
+
+def matching(queryset, query):
+    return get_backend().filter(queryset, query)
+
+
+def encode_cursor(pk, rank):
+    raw = CURSOR_SEPARATOR.join((str(pk), repr(rank)))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pk, rank = raw.split(CURSOR_SEPARATOR)
+        rank = float(rank)
+        if not math.isfinite(rank):
+            raise ValueError(rank)
+        return parse_id(pk), rank
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def search(query, token=None, per_page=None):
+    """A CursorPage of posts matching ``query``, best first."""
+    per_page = per_page or settings.POSTS_PER_PAGE
+    after = decode_cursor(token) if token else None
+    rows = get_backend().search(query, per_page + 1, after)
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for pk, _ in rows]
+    )
+    return CursorPage(
+        [posts[pk] for pk, _ in rows if pk in posts],
+        next_cursor=encode_cursor(*rows[-1]) if has_next else None,
+    )
+
+
+def search_page(request):
+    return search(
+        request.GET.get(QUERY_PARAM, ''), request.GET.get(CURSOR_PARAM)
+    )
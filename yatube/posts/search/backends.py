@@ -0,0 +1,135 @@
+from django.db import connection
+from django.db.models import Q
+
+from ..models import Post
+from .stemmer import stems
+
+TABLE = 'posts_search'
+
+
+class BaseBackend:
+    """What the search needs from an index of post texts.
+
+    ``search`` returns ``(post id, rank)`` pairs, best first, starting
+    after the ``after`` pair when it is given; a rank is a number and the
+    lower the better.
+    """
+
+    def index(self, posts):
+        raise NotImplementedError
+
+    def remove(self, ids):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit, after=None):
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """``queryset`` narrowed to the posts matching ``query``."""
+        raise NotImplementedError
+
+
+class FTS5Backend(BaseBackend):
+    """An SQLite FTS5 table of stemmed post texts, rowid being the post id.
+
+    FTS5 has no Russian stemmer, so texts and queries are stemmed by
+    ``stemmer`` before they get to the table; every stem of the query must
+    be in a post. Results are ranked by BM25.
+    """
+
+    @staticmethod
+    def match(query):
+        terms = [f'"{term}"' for term in dict.fromkeys(stems(query))]
+        return ' '.join(terms) or None
+
+    def index(self, posts):
+        rows = [(post.pk, ' '.join(stems(post.text))) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, body) VALUES (%s, %s)', rows
+            )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {TABLE} WHERE rowid = %s',
+                [(pk,) for pk in ids]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+
+    def search(self, query, limit, after=None):
+        match = self.match(query)
+        if match is None:
+            return []
+        sql = f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+        params = [match]
+        if after is not None:
+            pk, rank = after
+            sql += ' AND (rank > %s OR rank = %s AND rowid > %s)'
+            params += [rank, rank, pk]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+    def filter(self, queryset, query):
+        match = self.match(query)
+        if match is None:
+            return queryset
+        # A RawSQL in pk__in comes out as IN ((SELECT ...)), which SQLite
+        # reads as a single value.
+        pk = '{}.{}'.format(
+            connection.ops.quote_name(queryset.model._meta.db_table),
+            connection.ops.quote_name(queryset.model._meta.pk.column)
+        )
+        return queryset.extra(
+            where=[f'{pk} IN (SELECT rowid FROM {TABLE} '
+                   f'WHERE {TABLE} MATCH %s)'],
+            params=[match]
+        )
+
+
+class LikeBackend(BaseBackend):
+    """No index: every word of the query is looked up with ICONTAINS.
+
+    For databases without FTS5; all matches rank the same, newest first.
+    """
+
+    def index(self, posts):
+        pass
+
+    def remove(self, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def condition(self, query):
+        words = dict.fromkeys(word.lower() for word in query.split())
+        condition = Q()
+        for word in words:
+            condition &= Q(text__icontains=word)
+        return condition if words else None
+
+    def search(self, query, limit, after=None):
+        condition = self.condition(query)
+        if condition is None:
+            return []
+        posts = Post.objects.filter(condition).order_by('-pk')
+        if after is not None:
+            posts = posts.filter(pk__lt=after[0])
+        return [(pk, 0) for pk in posts.values_list('pk', flat=True)[:limit]]
+
+    def filter(self, queryset, query):
+        condition = self.condition(query)
+        return queryset if condition is None else queryset.filter(condition)
@@ -0,0 +1,110 @@
+"""A light Russian stemmer.
+
+Only inflectional endings are removed, after the Snowball algorithm for
+Russian without its derivational step: «котами», «коты» and «кота» all
+become «кот». Words in other scripts are only lowercased.
+"""
+import re
+from functools import lru_cache
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'^[а-я]+$')
+VOWELS = 'аеиоуыэюя'
+MAX_LENGTH = 40
+CACHE_SIZE = 50000
+
+
+def _endings(after_a, anywhere):
+    """Endings, each with whether it may follow anything, by length."""
+    endings = {ending: False for ending in after_a}
+    endings.update((ending, True) for ending in anywhere)
+    lengths = sorted({len(ending) for ending in endings}, reverse=True)
+    return endings, lengths
+
+
+PERFECTIVE_GERUND = _endings(
+    ('вшись', 'вши', 'в'),
+    ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'),
+)
+REFLEXIVE = _endings((), ('ся', 'сь'))
+ADJECTIVE = _endings((), (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей',
+    'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая',
+    'яя', 'ою', 'ею',
+))
+PARTICIPLE = _endings(
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+VERB = _endings(
+    ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'й', 'л', 'н'),
+    ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло',
+     'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл',
+     'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю'),
+)
+NOUN = _endings((), (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие',
+    'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях',
+    'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю',
+    'я',
+))
+SUPERLATIVE = _endings((), ('ейше', 'ейш'))
+
+
+def _strip(word, endings):
+    """Removes the longest of ``endings`` from ``word``.
+
+    The first group of endings only counts after «а» or «я», which stay.
+    Returns None when nothing matches.
+    """
+    endings, lengths = endings
+    for length in lengths:
+        anywhere = endings.get(word[-length:])
+        if anywhere is None:
+            continue
+        stem = word[:-length]
+        if anywhere or stem.endswith(('а', 'я')):
+            return stem
+    return None
+
+
+def _inflection(region):
+    stem = _strip(region, PERFECTIVE_GERUND)
+    if stem is not None:
+        return stem
+    region = _strip(region, REFLEXIVE) or region
+    stem = _strip(region, ADJECTIVE)
+    if stem is not None:
+        return _strip(stem, PARTICIPLE) or stem
+    for endings in (VERB, NOUN):
+        stem = _strip(region, endings)
+        if stem is not None:
+            return stem
+    return region
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def stem(word):
+    word = word.lower().replace('ё', 'е')[:MAX_LENGTH]
+    if not CYRILLIC.match(word):
+        return word
+    start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word)
+    )
+    prefix, region = word[:start], word[start:]
+    region = _inflection(region)
+    if region.endswith('и'):
+        region = region[:-1]
+    region = _strip(region, SUPERLATIVE) or region
+    if region.endswith('нн'):
+        region = region[:-1]
+    elif region.endswith('ь'):
+        region = region[:-1]
+    return prefix + region
+
+
+def stems(text):
+    """Stems of the words of ``text`` in order."""
+    return [stem(word) for word in WORD.findall(text)]
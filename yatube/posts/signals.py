@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.redis_cache import recovered
+
+from . import (archive, counters, feed_cache, images, search, tags,
+               thumbnails, timeline)
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+RENDERED_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def invalidate_post_pages(post, group_ids, moved=True):
+    slugs = list(Group.objects.filter(
+        pk__in=group_ids - {None}
+    ).values_list('slug', flat=True))
+    feed_cache.bump(
+        feed_cache.INDEX,
+        feed_cache.author_scope(post.author.username),
+        *(feed_cache.group_scope(slug) for slug in slugs)
+    )
+    archive.changed(post, slugs, moved)
+
+
+def invalidate_follow_pages(follow):
+    usernames = User.objects.filter(
+        pk__in=(follow.user_id, follow.author_id)
+    ).values_list('username', flat=True)
+    feed_cache.bump(*map(feed_cache.author_scope, usernames))
+
+
+@receiver(recovered)
+def cache_recovered(sender, **kwargs):
+    # Bumps made during the outage never reached the server.
+    feed_cache.bump(feed_cache.EPOCH)
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields and not RENDERED_USER_FIELDS & update_fields:
+        return
+    feed_cache.bump(feed_cache.USERS)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._previous_slug = instance.pk and Group.objects.filter(
+        pk=instance.pk
+    ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)}
+    slugs -= {None}
+    # Links to the group are on profile, tag and archive pages as well,
+    # and every feed page depends on USERS.
+    feed_cache.bump(
+        feed_cache.USERS,
+        feed_cache.INDEX,
+        feed_cache.archive_scope(feed_cache.INDEX),
+        *(feed_cache.group_scope(slug) for slug in slugs),
+        *(feed_cache.archive_scope(feed_cache.group_scope(slug))
+          for slug in slugs)
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    previous = instance.pk and Post.objects.filter(
+        pk=instance.pk
+    ).values('group_id', 'image', 'text').first()
+    instance._previous_group_id = previous and previous['group_id']
+    instance._previous_image = previous and previous['image']
+    instance._previous_text = previous and previous['text']
+    if instance.image.name != instance._previous_image:
+        metadata = instance.image and images.describe(instance.image)
+        for field, value in (metadata or images.EMPTY_METADATA).items():
+            setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    if not update_fields or 'text' in update_fields:
+        search.index([instance])
+        tags.update(instance, getattr(instance, '_previous_text', None) or '')
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    invalidate_post_pages(
+        instance, {instance.group_id, previous_group_id},
+        moved=created or previous_group_id != instance.group_id
+    )
+    previous_image = getattr(instance, '_previous_image', None)
+    if instance.image.name != previous_image:
+        thumbnails.schedule(instance.image.name)
+        images.release(previous_image)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+    search.remove([instance.pk])
+    tags.invalidate(
+        tags.parse_tags(instance.text), tags.parse_mentions(instance.text)
+    )
+    invalidate_post_pages(instance, {instance.group_id})
+    images.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(
+            instance.author_id, 'followers_count', 1
+        )
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+        timeline.update_celebrity(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+        invalidate_follow_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+    timeline.update_celebrity(instance.author_id)
+    timeline.prune(instance.user_id, instance.author_id)
+    invalidate_follow_pages(instance)
@@ -0,0 +1,156 @@
+"""#Tags and @mentions of posts.
+
+They are parsed from the text when a post is saved and kept in the
+PostTag and Mention tables with the publication date of the post, so the
+feed of a tag or of a user's mentions is a range of one index and never
+a scan of post texts. An edit only touches the tags and mentions that
+were added or removed since the previous text.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from . import feed_cache
+from .models import Mention, Post, PostTag, Tag
+from .utils import Keyset, pk_batches
+
+User = get_user_model()
+
+TAG = re.compile(r'(?<![\w#&])#(\w{1,50})')
+MENTION = re.compile(r'(?<![\w@])@([\w.+-]{1,150})')
+BATCH_SIZE = 500
+
+
+def parse_tags(text):
+    return {name.lower() for name in TAG.findall(text)}
+
+
+def parse_mentions(text):
+    # A mention at the end of a sentence keeps no trailing dot.
+    return {name.rstrip('.') for name in MENTION.findall(text)} - {''}
+
+
+def _add_tags(post, names):
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    PostTag.objects.bulk_create(
+        [
+            PostTag(post_id=post.pk, tag_id=tag_id, pub_date=post.pub_date)
+            for tag_id in Tag.objects.filter(
+                name__in=names
+            ).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+
+
+def _add_mentions(post, usernames):
+    Mention.objects.bulk_create(
+        [
+            Mention(post_id=post.pk, user_id=user_id, pub_date=post.pub_date)
+            for user_id in User.objects.filter(
+                username__in=usernames
+            ).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+
+
+def update(post, previous_text=''):
+    """Brings the index of ``post`` from ``previous_text`` to its text."""
+    old_tags, new_tags = parse_tags(previous_text), parse_tags(post.text)
+    old_mentions = parse_mentions(previous_text)
+    new_mentions = parse_mentions(post.text)
+    if old_tags - new_tags:
+        PostTag.objects.filter(
+            post_id=post.pk, tag__name__in=old_tags - new_tags
+        ).delete()
+    if new_tags - old_tags:
+        _add_tags(post, new_tags - old_tags)
+    if old_mentions - new_mentions:
+        Mention.objects.filter(
+            post_id=post.pk, user__username__in=old_mentions - new_mentions
+        ).delete()
+    if new_mentions - old_mentions:
+        _add_mentions(post, new_mentions - old_mentions)
+    invalidate(old_tags | new_tags, old_mentions | new_mentions)
+
+
+def scopes(tags, mentions):
+    return [feed_cache.tag_scope(name) for name in tags] + [
+        feed_cache.mention_scope(username) for username in mentions
+    ]
+
+
+def invalidate(tags, mentions):
+    changed = scopes(tags, mentions)
+    if changed:
+        feed_cache.bump(*changed)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Parses every post anew, returns how many there are."""
+    PostTag.objects.all().delete()
+    Mention.objects.all().delete()
+    indexed = 0
+    for batch in pk_batches(Post.objects.all(), batch_size):
+        for post in Post.objects.filter(pk__in=batch).only(
+            'text', 'pub_date'
+        ):
+            update(post)
+        indexed += len(batch)
+    return indexed
+
+
+class IndexKeyset:
+    def order(self, feed, backwards=False):
+        return IndexFeed(feed.relation, feed.value, feed.cursor, backwards)
+
+    def seek(self, feed, pub_date, pk, backwards=False):
+        return IndexFeed(feed.relation, feed.value, (pub_date, pk), backwards)
+
+
+class IndexFeed:
+    """Posts listed in an index table, read in its (pub_date, post) order.
+
+    ``relation`` is the reverse relation from Post to the table and
+    ``value`` what its row must point to, as in ``post_tags__tag=tag``.
+    The relation and the cursor share one filter() call, otherwise Django
+    joins the table twice.
+    """
+
+    keyset = IndexKeyset()
+
+    def __init__(self, relation, value, cursor=None, backwards=False):
+        self.relation = relation
+        self.value = value
+        self.cursor = cursor
+        self.backwards = backwards
+
+    @property
+    def queryset(self):
+        related = self.relation.split('__')[0]
+        keyset = Keyset(f'{related}__pub_date', f'{related}__post__id')
+        condition = Q(**{self.relation: self.value})
+        if self.cursor:
+            condition &= keyset.condition(*self.cursor, self.backwards)
+        queryset = Post.objects.filter(condition).select_related(
+            'author', 'group'
+        )
+        return keyset.order(queryset, self.backwards)
+
+    def __getitem__(self, key):
+        return self.queryset[key]
+
+    def __iter__(self):
+        return iter(self.queryset)
+
+
+def tag_feed(tag):
+    return IndexFeed('post_tags__tag', tag)
+
+
+def mention_feed(user):
+    return IndexFeed('mentions__user', user)
@@ -0,0 +1,52 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_KEY = 'posts:card:{}'
+
+
+def card_key(post, show_author):
+    author = post.author
+    parts = (
+        post.pk, post.updated.isoformat(), show_author,
+        author.username, author.first_name, author.last_name,
+        post.group.slug if post.group_id else '',
+    )
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return CARD_KEY.format(digest)
+
+
+@register.simple_tag
+def post_cards(page_obj, show_author=True):
+    """Renders feed cards, reusing cached markup of unchanged posts.
+
+    The whole page is fetched with one get_many and only missing cards are
+    rendered and stored back with one set_many.
+    """
+    posts = list(page_obj)
+    keys = [card_key(post, show_author) for post in posts]
+    cards = cache.get_many(keys)
+    thumbnails.prefetch(
+        [post for key, post in zip(keys, posts) if key not in cards], 'card'
+    )
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            cards[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post, 'show_author': show_author}
+            )
+            # Cards still waiting for a thumbnail are not worth keeping.
+            if thumbnails.PLACEHOLDER_CLASS not in cards[key]:
+                missing[key] = cards[key]
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,30 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from posts import tags
+
+register = template.Library()
+
+
+def _tag_link(match):
+    url = reverse('posts:tag_posts', args=[match[1].lower()])
+    return f'<a href="{url}">#{match[1]}</a>'
+
+
+def _mention_link(match):
+    username = match[1].rstrip('.')
+    if not username:
+        return match[0]
+    url = reverse('posts:profile', args=[username])
+    return f'<a href="{url}">@{username}</a>{match[1][len(username):]}'
+
+
+@register.filter(needs_autoescape=True)
+def link_tags(text, autoescape=True):
+    """Turns the #tags and @mentions of a post text into links."""
+    if autoescape:
+        text = conditional_escape(text)
+    text = tags.TAG.sub(_tag_link, text)
+    return mark_safe(tags.MENTION.sub(_mention_link, text))
@@ -0,0 +1,27 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, name):
+    """Returns a generated thumbnail, or None after queueing it.
+
+    Uses the result of ``thumbnails.prefetch`` when the page made one.
+    """
+    prefetched = getattr(post, '_thumbnails', {})
+    if name in prefetched:
+        return prefetched[name]
+    thumbnail = thumbnails.ready(post.image, name)
+    if thumbnail is None:
+        thumbnails.schedule(post.image)
+    return thumbnail
+
+
+@register.simple_tag
+def post_thumbnail_ratio(name):
+    """The ``aspect-ratio`` that keeps room for a pending thumbnail."""
+    width, height = thumbnails.size(name)
+    return f'{width} / {height}'
@@ -0,0 +1,128 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import page_counts
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counter(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comment_counter(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+    def test_deleting_author_cascades(self):
+        user = User.objects.create_user(username='leaving')
+        Post.objects.create(text='Пост', author=user)
+        Follow.objects.create(user=self.reader, author=user)
+        user_id = user.pk
+        user.delete()
+        self.assertFalse(AuthorStats.objects.filter(user=user_id).exists())
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+
+class PageCountsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_posts(self, count, author=None):
+        for number in range(count):
+            Post.objects.create(
+                text=f'Пост {number}', author=author or self.author,
+                group=self.group
+            )
+
+    def test_counts_are_cached_until_posts_change(self):
+        self.add_posts(3)
+        counts = (page_counts.index, lambda: page_counts.group(self.group))
+        self.assertEqual([count() for count in counts], [3, 3])
+        with self.assertNumQueries(0):
+            self.assertEqual([count() for count in counts], [3, 3])
+        # Writes without signals wait for the timeout.
+        Post.objects.bulk_create([Post(text='Пост', author=self.author)])
+        self.assertEqual(page_counts.index(), 3)
+        self.add_posts(1)
+        self.assertEqual([count() for count in counts], [5, 4])
+
+    def test_author_count_is_maintained(self):
+        self.add_posts(3)
+        author = User.objects.select_related('stats').get(pk=self.author.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(page_counts.author(author), 3)
+
+    def test_feed_adds_up_followed_authors(self):
+        other = User.objects.create_user(username='other')
+        self.add_posts(2)
+        self.add_posts(3, other)
+        self.assertEqual(page_counts.feed(self.reader), 2)
+        Follow.objects.create(user=self.reader, author=other)
+        self.assertEqual(page_counts.feed(self.reader), 5)
+        self.assertEqual(page_counts.feed(other), 0)
+
+    @override_settings(POST_COUNT_ESTIMATE_THRESHOLD=2)
+    def test_large_totals_are_estimated(self):
+        self.add_posts(4)
+        self.assertGreaterEqual(page_counts.index(), 4)
+        self.assertEqual(page_counts.group(self.group), 2)
+        response = self.client.get('/group/group/')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 2)
+        self.assertEqual(len(page_obj), 4)
@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.redis_cache import RedisCache, recovered
+
+from .. import feed_cache
+
+KEY = 'posts:page:concurrency'
+REQUESTS: int = 20
+
+
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+        self.lock = threading.Lock()
+        self.barrier = threading.Barrier(REQUESTS)
+
+    def tearDown(self):
+        cache.clear()
+
+    def build(self):
+        with self.lock:
+            self.builds += 1
+        time.sleep(0.2)
+        return 'fresh'
+
+    def request(self):
+        self.barrier.wait()
+        value, _ = feed_cache.single_flight(KEY, self.build, str)
+        return value
+
+    def fire(self):
+        with ThreadPoolExecutor(REQUESTS) as executor:
+            futures = [executor.submit(self.request) for _ in range(REQUESTS)]
+            return [future.result() for future in futures]
+
+    def test_expired_entry_rebuilt_once_and_served_stale(self):
+        cache.set(
+            KEY, {'value': 'stale', 'expires': time.time() - 1, 'delta': 0}
+        )
+        values = self.fire()
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(values.count('fresh'), 1)
+        self.assertEqual(values.count('stale'), REQUESTS - 1)
+        self.assertEqual(feed_cache.stats()['stale'], REQUESTS - 1)
+        self.assertEqual(cache.get(KEY)['value'], 'fresh')
+
+    def test_missing_entry_rebuilt_once_while_others_wait(self):
+        values = self.fire()
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(values, ['fresh'] * REQUESTS)
+
+    def test_fresh_entry_is_not_rebuilt(self):
+        cache.set(
+            KEY, {'value': 'cached', 'expires': time.time() + 60, 'delta': 0}
+        )
+        self.assertEqual(self.fire(), ['cached'] * REQUESTS)
+        self.assertEqual(self.builds, 0)
+
+
+class EpochTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_recovery_invalidates_every_scope(self):
+        before = feed_cache.generations([feed_cache.INDEX, 'group:slug'])
+        recovered.send(sender=RedisCache, cache=cache)
+        after = feed_cache.generations([feed_cache.INDEX, 'group:slug'])
+        self.assertNotEqual(before[0], after[0])
+        self.assertNotEqual(before[1], after[1])
@@ -1,13 +1,18 @@
+import hashlib
+import os
 import shutil
 import tempfile
 from http import HTTPStatus
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from .. import images
 from ..models import Comment, Group, Post, User
+from .utils import png_bomb
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -19,6 +24,9 @@ SMALL_GIF = (
     b'\x02\x00\x01\x00\x00\x02\x02\x0C'
     b'\x0A\x00\x3B'
 )
+SMALL_GIF_HASH = hashlib.sha256(SMALL_GIF).hexdigest()
+SMALL_GIF_NAME = f'posts/{SMALL_GIF_HASH[:2]}/{SMALL_GIF_HASH}.gif'
+GREEN_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -87,7 +95,7 @@ class PostFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.author, self.post_author)
         self.assertEqual(post.group_id, form_data['group'])
-        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertEqual(post.image.name, SMALL_GIF_NAME)
 
     def test_authorized_user_edit_post(self):
         post = Post.objects.create(
@@ -122,7 +130,123 @@ class PostFormTests(TestCase):
         self.assertEqual(created_post.author, post.author)
         self.assertEqual(created_post.group_id, form_data['group'])
         self.assertEqual(created_post.pub_date, post.pub_date)
-        self.assertEqual(created_post.image.name, 'posts/other_small.gif')
+        self.assertEqual(created_post.image.name, SMALL_GIF_NAME)
+
+    @override_settings(MEDIA_GC_GRACE_PERIOD=0)
+    def test_identical_images_are_stored_once(self):
+        posts = [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=self.post_author,
+                image=SimpleUploadedFile(
+                    name=f'copy_{number}.gif',
+                    content=GREEN_GIF,
+                    content_type='image/gif'
+                )
+            )
+            for number in range(3)
+        ]
+        names = {post.image.name for post in posts}
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertNotIn('copy', name)
+        directory = os.path.dirname(posts[0].image.path)
+        self.assertEqual(os.listdir(directory), [os.path.basename(name)])
+        for post in posts[1:]:
+            post.delete()
+            images._delete_unused(name)
+            self.assertTrue(os.path.exists(posts[0].image.path))
+        posts[0].delete()
+        images._delete_unused(name)
+        self.assertFalse(os.path.exists(posts[0].image.path))
+
+    def test_recently_uploaded_image_is_left_to_collector(self):
+        post = Post.objects.create(
+            text='Пост',
+            author=self.post_author,
+            image=SimpleUploadedFile(
+                name='green.gif', content=GREEN_GIF, content_type='image/gif'
+            )
+        )
+        path = post.image.path
+        post.delete()
+        images._delete_unused(post.image.name)
+        self.assertTrue(os.path.exists(path))
+        with override_settings(MEDIA_GC_GRACE_PERIOD=0):
+            images._delete_unused(post.image.name)
+        self.assertFalse(os.path.exists(path))
+
+    def test_image_metadata_is_stored_on_upload(self):
+        post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.post_author,
+            image=SimpleUploadedFile(
+                name='green.gif', content=GREEN_GIF, content_type='image/gif'
+            )
+        )
+        post.refresh_from_db()
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        self.assertEqual(post.image.read(), GREEN_GIF)
+        post.image = ''
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image_color, '')
+        self.assertEqual(post.image_placeholder, '')
+
+    def test_backfill_fills_older_posts(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            image_color='', image_placeholder=''
+        )
+        broken = Post.objects.create(
+            text='Пост без файла', author=self.post_author
+        )
+        Post.objects.filter(pk=broken.pk).update(image='posts/missing.gif')
+        call_command('backfill_images', workers=2, batch_size=1, stdout=open(
+            os.devnull, 'w'
+        ))
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        self.assertNotEqual(post.image_placeholder, '')
+        self.assertEqual(Post.objects.get(pk=broken.pk).image_placeholder, '')
+
+    def create_with_image(self, name, content):
+        posts_count = Post.objects.count()
+        response = self.authorized_user.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(name, content, 'image/png'),
+            }
+        )
+        self.assertEqual(Post.objects.count(), posts_count)
+        return response.context['form'].errors['image'][0]
+
+    @override_settings(UPLOAD_MAX_SIZE=len(SMALL_GIF) - 1)
+    def test_oversized_upload_is_rejected(self):
+        self.assertIn(
+            'больше 42\xa0байта', self.create_with_image('big.gif', SMALL_GIF)
+        )
+
+    def test_decompression_bomb_is_rejected_from_header(self):
+        bomb = png_bomb(8000, 8000)
+        self.assertLess(len(bomb), 100 * 1024)
+        self.assertIn('мегапикселей', self.create_with_image('bomb.png', bomb))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=500 * 1000)
+    def test_pixel_limit_under_a_megapixel_is_shown(self):
+        self.assertIn(
+            'больше 0,5 мегапикселей',
+            self.create_with_image('bomb.png', png_bomb(1000, 1000))
+        )
+
+    def test_truncated_image_is_rejected(self):
+        truncated = png_bomb(100, 100)[:-30]
+        self.assertIn(
+            'изображение', self.create_with_image('cut.png', truncated)
+        )
 
     def test_nonauthorized_user_create_post(self):
         posts_count = Post.objects.count()
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FEED_TABLES = ('posts_post', 'posts_comment', 'posts_timeline')
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(
+            user=User.objects.create_user(username='other_reader'),
+            author=cls.author
+        )
+        for number in range(15):
+            cls.post = Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def query_plans(self, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, data)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if 'ORDER BY' not in sql:
+                    continue
+                if not any(f'"{table}"' in sql for table in FEED_TABLES):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans[sql] = [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def test_feed_queries_use_indexes(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            for data in ({}, {'page': 2}, {'cursor': ''}):
+                with self.subTest(url=url, data=data):
+                    plans = self.query_plans(url, data)
+                    self.assertTrue(plans)
+                    for sql, plan in plans.items():
+                        details = ' '.join(plan)
+                        self.assertNotIn('TEMP B-TREE', details, sql)
+                        for step in plan:
+                            if step.startswith('SCAN'):
+                                self.assertIn('INDEX', step, sql)
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+from .test_forms import GREEN_GIF, SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class OrphanedMediaTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        self.kept, self.dropped = [
+            Post.objects.create(
+                text='Пост', author=author,
+                image=SimpleUploadedFile(name, content, 'image/gif')
+            )
+            for name, content in (('a.gif', SMALL_GIF), ('b.gif', GREEN_GIF))
+        ]
+        for post in (self.kept, self.dropped):
+            thumbnails.generate(post.image.name)
+        self.kept_thumbnail = thumbnails.ready(self.kept.image, 'card').src
+        self.dropped_picture = thumbnails.ready(self.dropped.image, 'card')
+        # Signals would release the file; a lost delete is what is left.
+        Post.objects.filter(pk=self.dropped.pk).update(image='')
+        self.stray = os.path.join(TEMP_MEDIA_ROOT, 'cache', 'zz', 'stray.jpg')
+        os.makedirs(os.path.dirname(self.stray), exist_ok=True)
+        with open(self.stray, 'wb') as file:
+            file.write(b'jpeg')
+
+    def collect(self, **options):
+        stdout = StringIO()
+        call_command('collect_media', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def path(self, url):
+        return os.path.join(
+            TEMP_MEDIA_ROOT, url[len(settings.MEDIA_URL):]
+        )
+
+    def test_orphans_are_deleted_after_grace_period(self):
+        dropped_thumbnails = [
+            self.path(thumbnail.url)
+            for _, thumbnail in self.dropped_picture.files
+        ]
+        self.assertIn('картинок 0, миниатюр 0', self.collect(grace=3600))
+        self.assertTrue(os.path.exists(self.stray))
+        self.assertIsNotNone(thumbnails.ready(self.dropped.image, 'card'))
+        output = self.collect(grace=0, dry_run=True)
+        self.assertIn('Будет удалено: картинок 1, миниатюр', output)
+        self.assertTrue(os.path.exists(self.dropped.image.path))
+        output = self.collect(grace=0)
+        self.assertIn('Удалено: картинок 1,', output)
+        self.assertFalse(os.path.exists(self.dropped.image.path))
+        self.assertFalse(os.path.exists(self.stray))
+        for path in dropped_thumbnails:
+            self.assertFalse(os.path.exists(path))
+        self.assertIsNone(thumbnails.ready(self.dropped.image.name, 'card'))
+        self.assertTrue(os.path.exists(self.kept.image.path))
+        self.assertTrue(os.path.exists(self.path(self.kept_thumbnail)))
+        self.assertIsNotNone(thumbnails.ready(self.kept.image, 'card'))
+
+    def test_images_in_use_again_are_kept(self):
+        Post.objects.filter(pk=self.kept.pk).update(
+            image=self.dropped.image.name
+        )
+        os.remove(self.kept.image.path)
+        self.assertIn('записей хранилища 1', self.collect(grace=3600))
+        self.assertIsNone(thumbnails.ready(self.kept.image.name, 'card'))
+        self.assertFalse(os.path.exists(self.path(self.kept_thumbnail)))
+        self.collect(grace=0)
+        self.assertTrue(os.path.exists(self.dropped.image.path))
+        self.assertFalse(os.path.exists(self.kept.image.path))
+        self.assertIsNotNone(default.kvstore.get(
+            thumbnails.source(self.dropped.image.name)
+        ))
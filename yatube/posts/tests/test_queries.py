@@ -0,0 +1,236 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from .. import feed_cache, thumbnails
+from ..models import Comment, Follow, Group, Post
+from ..urls import urlpatterns
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+FEED_POSTS: int = 15
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Первый пост #тег для @reader', author=cls.author,
+            group=cls.group
+        )
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {number}'
+            )
+        month = {
+            'year': timezone.localtime().year,
+            'month': timezone.localtime().month,
+        }
+        cls.budgets = {
+            'index': (reverse('posts:index'), 'get', 4),
+            'group_list': (
+                reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+                'get', 5
+            ),
+            'profile': (
+                reverse('posts:profile', kwargs={'username': 'author'}),
+                'get', 6
+            ),
+            'post_detail': (
+                reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+                'get', 5
+            ),
+            'post_search': (
+                reverse('posts:post_search') + '?q=пост', 'get', 4
+            ),
+            'tag_posts': (
+                reverse('posts:tag_posts', args=['тег']), 'get', 4
+            ),
+            'profile_mentions': (
+                reverse('posts:profile_mentions', args=['reader']), 'get', 4
+            ),
+            'archive': (reverse('posts:archive'), 'get', 3),
+            'archive_month': (
+                reverse('posts:archive_month', kwargs=month), 'get', 6
+            ),
+            'group_archive': (
+                reverse('posts:group_archive', kwargs={'slug': 'test-slug'}),
+                'get', 4
+            ),
+            'group_archive_month': (
+                reverse(
+                    'posts:group_archive_month',
+                    kwargs={'slug': 'test-slug', **month}
+                ),
+                'get', 7
+            ),
+            'profile_archive': (
+                reverse(
+                    'posts:profile_archive', kwargs={'username': 'author'}
+                ),
+                'get', 4
+            ),
+            'profile_archive_month': (
+                reverse(
+                    'posts:profile_archive_month',
+                    kwargs={'username': 'author', **month}
+                ),
+                'get', 7
+            ),
+            'post_create': (reverse('posts:post_create'), 'get', 3),
+            'post_edit': (
+                reverse('posts:post_edit', kwargs={'post_id': cls.post.pk}),
+                'get', 4
+            ),
+            'add_comment': (
+                reverse('posts:add_comment', kwargs={'post_id': cls.post.pk}),
+                'post', 5
+            ),
+            'follow_index': (reverse('posts:follow_index'), 'get', 5),
+            'profile_follow': (
+                reverse('posts:profile_follow', kwargs={'username': 'author'}),
+                'get', 4
+            ),
+            'profile_unfollow': (
+                reverse(
+                    'posts:profile_unfollow', kwargs={'username': 'author'}
+                ),
+                'get', 10
+            ),
+        }
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_posts(self, count):
+        for number in range(count):
+            Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group
+            )
+
+    def test_every_route_has_budget(self):
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names, set(self.budgets))
+
+    def test_routes_fit_budget(self):
+        self.add_posts(FEED_POSTS)
+        for name, (url, method, budget) in self.budgets.items():
+            with self.subTest(name=name):
+                client = (
+                    self.author_client if name == 'post_edit' else self.client
+                )
+                data = {'text': 'Комментарий'} if method == 'post' else None
+                cache.clear()
+                self.assertQueryBudget(client, url, budget, method, data)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        feeds = ('index', 'group_list', 'profile', 'follow_index')
+        small = {}
+        for name in feeds:
+            cache.clear()
+            small[name] = len(self.count_queries(
+                self.client, self.budgets[name][0]
+            ))
+        self.add_posts(FEED_POSTS)
+        for name in feeds:
+            with self.subTest(name=name):
+                cache.clear()
+                self.assertEqual(
+                    len(self.count_queries(
+                        self.client, self.budgets[name][0]
+                    )),
+                    small[name]
+                )
+
+    def test_revalidation_skips_rendering(self):
+        # Only the session and the user are loaded for feeds; post detail
+        # adds a single query for its validators.
+        budgets = {
+            'index': 2, 'group_list': 2, 'profile': 2, 'post_detail': 3,
+        }
+        for name, budget in budgets.items():
+            with self.subTest(name=name):
+                url = self.budgets[name][0]
+                self.client.get(url)
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(len(context), budget)
+
+    def count_thumbnail_lookups(self, url):
+        """Counts cache round trips for sorl-thumbnail keys.
+
+        Calls a backend makes internally, like LocMemCache.get_many going
+        through get, are not round trips and are not counted.
+        """
+        store = caches['default']
+        lookups = []
+        active = []
+
+        def spy(method):
+            original = getattr(store, method)
+
+            def wrapper(keys, *args, **kwargs):
+                names = [keys] if method == 'get' else list(keys)
+                if not active and any(
+                    sorl_settings.THUMBNAIL_KEY_PREFIX in name
+                    for name in names
+                ):
+                    lookups.append((method, len(names)))
+                active.append(method)
+                try:
+                    return original(
+                        keys if method == 'get' else names, *args, **kwargs
+                    )
+                finally:
+                    active.pop()
+            return patch.object(store, method, wrapper)
+
+        with spy('get'), spy('get_many'):
+            context = self.count_queries(self.client, url)
+        return context, lookups
+
+    def test_feed_thumbnails_are_looked_up_in_bulk(self):
+        self.add_posts(FEED_POSTS)
+        url = self.budgets['index'][0]
+        cache.clear()
+        plain = len(self.count_queries(self.client, url))
+        for post in Post.objects.all():
+            # Posts may share an image file.
+            post.image = f'posts/{post.pk % 5}.gif'
+            post.save()
+        cache.clear()
+        keys = 5 * len(thumbnails.variants('posts/0.gif', 'card'))
+        context, lookups = self.count_thumbnail_lookups(url)
+        self.assertEqual(lookups, [('get_many', keys)])
+        self.assertEqual(len(context), plain + 1)
+        feed_cache.bump(feed_cache.INDEX)
+        context, lookups = self.count_thumbnail_lookups(url)
+        self.assertEqual(lookups, [('get_many', keys)])
+        self.assertEqual(len(context), plain)
@@ -0,0 +1,113 @@
+import base64
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+from ..search.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_inflections_share_a_stem(self):
+        for words in (
+            ('кот', 'кота', 'коты', 'котами', 'котов'),
+            ('красивый', 'красивая', 'красивыми', 'красивейший'),
+            ('ёлка', 'елки', 'Ёлками'),
+        ):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+        self.assertNotEqual(stem('кот'), stem('котик'))
+        self.assertEqual(stem('Django'), 'django')
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher')
+        cls.cats = Post.objects.create(
+            text='Коты спят, коты едят, коты гуляют', author=cls.user
+        )
+        cls.cat = Post.objects.create(
+            text='Про кота и собаку', author=cls.user
+        )
+        cls.dogs = Post.objects.create(
+            text='Только собаки', author=cls.user
+        )
+        cls.url = reverse('posts:post_search')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_results_are_ranked_and_stemmed(self):
+        response = self.client.get(self.url, {'q': 'котами'})
+        self.assertEqual(
+            list(response.context['page_obj']), [self.cats, self.cat]
+        )
+        response = self.client.get(self.url, {'q': 'кот собака'})
+        self.assertEqual(list(response.context['page_obj']), [self.cat])
+        response = self.client.get(self.url, {'q': 'жираф'})
+        self.assertContains(response, 'Ничего не найдено')
+
+    def test_pages_follow_the_rank_keyset(self):
+        for number in range(5):
+            Post.objects.create(text='кот ' * (number + 1), author=self.user)
+        expected = [post.pk for post in search.search('кот', per_page=100)]
+        seen, token = [], None
+        while True:
+            page = search.search('кот', token, per_page=3)
+            seen += [post.pk for post in page]
+            if not page.has_next():
+                break
+            token = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 7)
+
+    def test_out_of_range_cursor_starts_over(self):
+        for raw in ('9' * 30 + '|1.0', '1|nan'):
+            with self.subTest(raw=raw):
+                token = base64.urlsafe_b64encode(raw.encode()).decode()
+                response = self.client.get(
+                    self.url, {'q': 'кот', 'cursor': token}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(search.decode_cursor(token))
+
+    def test_index_follows_edits_and_deletes(self):
+        dogs = Post.objects.get(pk=self.dogs.pk)
+        dogs.text = 'Собаки и коты'
+        dogs.save()
+        Post.objects.get(pk=self.cats.pk).delete()
+        self.assertCountEqual(search.search('кот'), [self.dogs, self.cat])
+
+    def test_rebuild_indexes_bulk_created_posts(self):
+        Post.objects.bulk_create([Post(text='Котами', author=self.user)])
+        self.assertEqual(len(search.search('кот')), 2)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search.search('кот')), 3)
+
+    def test_admin_search_uses_the_index(self):
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset, duplicates = admin.get_search_results(
+            request, Post.objects.all(), 'котами'
+        )
+        self.assertCountEqual(queryset, [self.cats, self.cat])
+        self.assertFalse(duplicates)
+
+    @override_settings(
+        POSTS_SEARCH_BACKEND='posts.search.backends.LikeBackend'
+    )
+    def test_like_backend_without_index(self):
+        self.assertEqual(list(search.search('кота')), [self.cat])
+        self.assertCountEqual(
+            search.matching(Post.objects.all(), 'собак'),
+            [self.cat, self.dogs]
+        )
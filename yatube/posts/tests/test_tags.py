@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import tags
+from ..models import Post, PostTag, Tag
+
+User = get_user_model()
+
+NUMBER_OF_POSTS: int = 7
+PER_PAGE: int = 3
+
+
+class ParseTest(TestCase):
+    def test_tags_and_mentions_are_normalized(self):
+        text = 'Про #Котов и #коты, привет @reader. Письмо a@b, &#x27;'
+        self.assertEqual(tags.parse_tags(text), {'котов', 'коты'})
+        self.assertEqual(tags.parse_mentions(text), {'reader'})
+
+
+class TagIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_create_and_edit_update_index_incrementally(self):
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': '#Кот и #пёс для @reader и @nobody'}
+        )
+        post = Post.objects.get()
+        self.assertCountEqual(
+            post.post_tags.values_list('tag__name', flat=True),
+            ['кот', 'пёс']
+        )
+        self.assertEqual(
+            list(post.mentions.values_list('user', flat=True)),
+            [self.reader.pk]
+        )
+        kept = PostTag.objects.get(tag__name='кот').pk
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': '#кот и #мышь'}
+        )
+        self.assertCountEqual(
+            post.post_tags.values_list('tag__name', flat=True),
+            ['кот', 'мышь']
+        )
+        self.assertEqual(PostTag.objects.get(tag__name='кот').pk, kept)
+        self.assertFalse(post.mentions.exists())
+        post.delete()
+        self.assertFalse(PostTag.objects.exists())
+
+    @override_settings(POSTS_PER_PAGE=PER_PAGE)
+    def test_tag_and_mention_pages_use_keyset(self):
+        for number in range(NUMBER_OF_POSTS):
+            Post.objects.create(
+                text=f'Пост {number} #тег @reader', author=self.author
+            )
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        for url in (
+            reverse('posts:tag_posts', args=['Тег']),
+            reverse('posts:profile_mentions', args=['reader']),
+        ):
+            with self.subTest(url=url):
+                seen, cursor = [], ''
+                while cursor is not None:
+                    page_obj = self.client.get(
+                        url, {'cursor': cursor}
+                    ).context['page_obj']
+                    seen += [post.pk for post in page_obj]
+                    cursor = page_obj.next_cursor
+                self.assertEqual(seen, expected)
+        feed = tags.tag_feed(Tag.objects.get())
+        pub_date, pk = Post.objects.values_list('pub_date', 'pk').first()
+        query = str(feed.keyset.seek(feed, pub_date, pk).queryset.query)
+        self.assertEqual(query.count('JOIN "posts_posttag"'), 1)
+
+    def test_cards_link_tags_and_mentions(self):
+        Post.objects.create(text='Смотри #Тег, @reader.', author=self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, f'href="{reverse("posts:tag_posts", args=["тег"])}"'
+        )
+        self.assertContains(
+            response,
+            f'<a href="{reverse("posts:profile", args=["reader"])}">'
+            '@reader</a>.'
+        )
+        response = self.client.get(reverse('posts:tag_posts', args=['нет']))
+        self.assertEqual(response.status_code, 404)
@@ -1,16 +1,28 @@
+import base64
+import json
+import math
+import os
 import shutil
 import tempfile
+import time
+from datetime import datetime
+from io import StringIO
 from typing import List
+from unittest.mock import patch
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Follow, Group, Post
+from posts import counters, feed_cache, thumbnails, timeline
+from posts.models import Follow, Group, Post, Timeline
+from posts.utils import CountedPaginator
 
 User = get_user_model()
 
@@ -20,6 +32,7 @@ EXPECTED_POSTS_NUMBER: int = 10
 EXPECTED_POSTS_NUMBER_ON_SECOND_PAGE: int = 5
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+HASHED_GIF = r'^posts/([0-9a-f]{2})/\1[0-9a-f]{62}\.gif$'
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -145,7 +158,7 @@ class PostPagesTests(TestCase):
                 posts_image = Post.objects.first().image
                 form_field = response.context['form'].fields[value]
                 self.assertIsInstance(form_field, expected)
-                self.assertEqual(posts_image, 'posts/small.gif')
+                self.assertRegex(posts_image.name, HASHED_GIF)
 
     def test_create_show_correct_context(self):
         response = self.authorized_client.get(
@@ -192,14 +205,261 @@ class PostPagesTests(TestCase):
     def test_check_cache(self):
         response = self.client.get(reverse('posts:index'))
         first_response = response.content
-        Post.objects.first().delete()
         response2 = self.client.get(reverse('posts:index'))
         second_response = response2.content
         self.assertEqual(first_response, second_response)
-        cache.clear()
+        self.assertEqual(
+            feed_cache.stats(), {'hit': 1, 'miss': 1, 'stale': 0}
+        )
+        Post.objects.first().delete()
         response3 = self.client.get(reverse('posts:index'))
         third_response = response3.content
         self.assertNotEqual(second_response, third_response)
+        self.assertEqual(
+            feed_cache.stats(), {'hit': 1, 'miss': 2, 'stale': 0}
+        )
+
+    def test_post_edit_invalidates_cached_feeds(self):
+        other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Другое описание'
+        )
+        other_group_url = reverse(
+            'posts:group_list', kwargs={'slug': other_group.slug}
+        )
+        urls = (
+            self.index_url, self.group_list_url, self.profile_url,
+            other_group_url,
+        )
+        before = {url: self.client.get(url).content for url in urls}
+        self.authorized_client.post(
+            self.post_edit_url,
+            {'text': 'Отредактированный пост', 'group': other_group.pk}
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(self.client.get(url).content, before[url])
+
+    def test_group_rename_invalidates_links_on_every_feed(self):
+        pub_date = timezone.localtime(self.post.pub_date)
+        urls = (
+            self.profile_url,
+            reverse(
+                'posts:profile_archive_month',
+                kwargs={
+                    'username': self.user.username,
+                    'year': pub_date.year, 'month': pub_date.month,
+                }
+            ),
+        )
+        for url in urls:
+            self.assertContains(self.client.get(url), self.group_list_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed-slug'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotContains(response, self.group_list_url)
+                self.assertContains(response, '/group/renamed-slug/')
+
+    def test_post_cards_are_fragment_cached(self):
+        thumbnails.generate(self.post.image.name)
+        card_template = 'posts/includes/post_card.html'
+        response = self.client.get(self.index_url)
+        self.assertTemplateUsed(response, card_template)
+        response = self.client.get(self.group_list_url)
+        self.assertTemplateNotUsed(response, card_template)
+        self.assertContains(response, self.post.text)
+        self.authorized_client.post(
+            self.post_edit_url, {'text': 'Новый текст', 'group': self.group.pk}
+        )
+        response = self.client.get(self.group_list_url)
+        self.assertTemplateUsed(response, card_template)
+        self.assertContains(response, 'Новый текст')
+
+    def test_thumbnails_are_generated_by_worker(self):
+        response = self.client.get(self.post_detail_url)
+        self.assertContains(response, thumbnails.PLACEHOLDER_CLASS)
+        self.assertContains(response, self.post.image_placeholder)
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertIsNone(thumbnails.ready(self.post.image, 'card'))
+        feed = self.client.get(self.index_url).content
+        thumbnails.worker.process(self.post.image.name, time.monotonic())
+        picture = thumbnails.ready(self.post.image, 'card')
+        self.assertIsNotNone(picture)
+        response = self.client.get(self.post_detail_url)
+        self.assertNotContains(response, thumbnails.PLACEHOLDER_CLASS)
+        self.assertContains(response, picture.src)
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotEqual(self.client.get(self.index_url).content, feed)
+        stats = thumbnails.stats()
+        self.assertEqual(stats['generated'], 1)
+        self.assertEqual(stats['failed'], 0)
+
+    @override_settings(POST_THUMBNAILS_ASYNC=False)
+    def test_synchronous_worker_renders_on_put(self):
+        thumbnails.worker.put(self.post.image.name)
+        self.assertIsNotNone(thumbnails.ready(self.post.image, 'card'))
+        self.assertIsNone(thumbnails.worker.thread)
+
+    def test_ready_thumbnails_bump_archive_and_tag_pages(self):
+        post = Post.objects.create(
+            author=self.user, text='Снимок #фото', image=self.post.image.name
+        )
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.make_aware(datetime(2020, 3, 5))
+        )
+        scopes = [
+            feed_cache.archive_scope(feed_cache.INDEX, 2020, 3),
+            feed_cache.archive_scope(
+                feed_cache.author_scope(self.user.username), 2020, 3
+            ),
+            feed_cache.tag_scope('фото'),
+        ]
+        before = feed_cache.generations(scopes)
+        thumbnails.invalidate_pages(self.post.image.name)
+        after = feed_cache.generations(scopes)
+        for scope, old, new in zip(scopes, before, after):
+            with self.subTest(scope=scope):
+                self.assertNotEqual(old, new)
+
+    @override_settings(POST_IMAGE_FORMATS=('AVIF', 'PNG'))
+    def test_thumbnails_come_in_widths_and_formats(self):
+        variants = thumbnails.variants(self.post.image.name, 'card')
+        self.assertEqual(
+            [(variant.format, variant.geometry) for variant in variants],
+            [('PNG', '480x170'), ('PNG', '960x339'),
+             ('GIF', '480x170'), ('GIF', '960x339')]
+        )
+        self.assertTrue(thumbnails.generate(self.post.image.name))
+        picture = thumbnails.ready(self.post.image, 'card')
+        self.assertEqual(len(picture.sources), 1)
+        self.assertEqual(picture.sources[0]['type'], 'image/png')
+        self.assertRegex(
+            picture.sources[0]['srcset'], r'^\S+\.png 480w, \S+\.png 960w$'
+        )
+        self.assertRegex(picture.srcset, r'^\S+\.gif 480w, \S+\.gif 960w$')
+        self.assertTrue(picture.src.endswith('.gif'))
+        response = self.client.get(self.post_detail_url)
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, picture.sources[0]['srcset'])
+
+    def test_failed_thumbnails_are_not_retried_at_once(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image='posts/missing.jpg'
+        )
+        thumbnails.worker.process(post.image.name, time.monotonic())
+        self.assertEqual(thumbnails.stats()['failed'], 1)
+        self.assertIsNone(thumbnails.ready(post.image, 'card'))
+        with patch.object(thumbnails.worker, 'put') as put:
+            thumbnails.schedule(post.image.name)
+        put.assert_not_called()
+
+    def test_bulk_generation_resumes_from_checkpoint(self):
+        checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'checkpoint')
+        broken = Post.objects.create(
+            author=self.user, text='Пост', image='posts/missing.jpg'
+        )
+        options = {
+            'processes': 1, 'checkpoint': checkpoint, 'stdout': StringIO()
+        }
+        call_command('generate_thumbnails', dry_run=True, **options)
+        self.assertIn('без миниатюр 2,', options['stdout'].getvalue())
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assertIsNone(thumbnails.ready(self.post.image, 'card'))
+        options['stdout'] = StringIO()
+        call_command('generate_thumbnails', **options)
+        self.assertIn('обработано 2, ошибок 1', options['stdout'].getvalue())
+        self.assertIsNotNone(thumbnails.ready(self.post.image, 'card'))
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file)['last_id'], broken.pk)
+        options['stdout'] = StringIO()
+        call_command('generate_thumbnails', **options)
+        self.assertIn('постов 0,', options['stdout'].getvalue())
+        with override_settings(POST_IMAGE_WIDTHS=(320,)):
+            options['stdout'] = StringIO()
+            call_command('generate_thumbnails', dry_run=True, **options)
+        self.assertIn('без миниатюр 2,', options['stdout'].getvalue())
+
+    def test_forced_generation_renders_thumbnails_again(self):
+        checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'forced')
+        thumbnails.generate(self.post.image.name)
+        files = [
+            thumbnails.thumbnail_file(
+                self.post.image.name, variant.geometry, **variant.options
+            )
+            for variant in thumbnails.variants(self.post.image.name, 'card')
+        ]
+        for file_ in files:
+            file_.storage.delete(file_.name)
+        options = {
+            'processes': 1, 'checkpoint': checkpoint, 'stdout': StringIO()
+        }
+        call_command('generate_thumbnails', **options)
+        self.assertIn('обработано 0,', options['stdout'].getvalue())
+        self.assertFalse(any(file_.exists() for file_ in files))
+        options['stdout'] = StringIO()
+        call_command('generate_thumbnails', force=True, **options)
+        self.assertIn('обработано 1,', options['stdout'].getvalue())
+        self.assertTrue(all(file_.exists() for file_ in files))
+        self.assertIsNotNone(thumbnails.ready(self.post.image, 'card'))
+
+    def test_feeds_answer_conditional_requests(self):
+        for url in (self.index_url, self.group_list_url, self.profile_url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response['ETag']
+                self.assertEqual(
+                    self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                    304
+                )
+                self.assertEqual(
+                    self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    ).status_code,
+                    200
+                )
+        response = self.client.get(self.index_url)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(
+            self.index_url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый пост')
+
+    def test_post_detail_answers_conditional_requests(self):
+        self.authorized_client.get(self.post_detail_url)
+        response = self.authorized_client.get(self.post_detail_url)
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+        self.assertEqual(
+            self.authorized_client.get(
+                self.post_detail_url, HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            304
+        )
+        self.assertEqual(
+            self.authorized_client.get(
+                self.post_detail_url,
+                HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            ).status_code,
+            304
+        )
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Новый комментарий'}
+        )
+        response = self.authorized_client.get(
+            self.post_detail_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый комментарий')
 
     def test_home_page_contains_image_in_context(self):
         response = self.authorized_client.get(
@@ -234,7 +494,7 @@ class PostPagesTests(TestCase):
             follow=True
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
-        self.assertEqual(Post.objects.last().image, 'posts/small.gif')
+        self.assertRegex(Post.objects.last().image.name, HASHED_GIF)
         self.assertRedirects(response, reverse(
             'posts:profile',
             kwargs={'username': self.user.username})
@@ -274,6 +534,7 @@ class PaginatorTest(TestCase):
             )
 
         Post.objects.bulk_create(list_of_posts)
+        counters.recount_users([cls.user.pk])
 
     def setUp(self) -> None:
         cache.clear()
@@ -306,6 +567,34 @@ class PaginatorTest(TestCase):
                     expected_number_of_posts
                 )
 
+    @override_settings(POSTS_PER_PAGE=1, POSTS_MAX_PAGE=10)
+    def test_page_range_is_elided_and_deep_pages_use_cursors(self):
+        ellipsis = CountedPaginator.ELLIPSIS
+        response = self.guest_client.get('/')
+        self.assertEqual(
+            response.context['page_obj'].elided_page_range,
+            [1, 2, 3, ellipsis, 10]
+        )
+        response = self.guest_client.get('/?page=5')
+        self.assertEqual(
+            response.context['page_obj'].elided_page_range,
+            [1, ellipsis, 3, 4, 5, 6, 7, ellipsis, 10]
+        )
+        self.assertIsNone(response.context['page_obj'].continue_cursor)
+        self.assertEqual(response.content.count(b'?page='), 10)
+        response = self.guest_client.get('/?page=14')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 10)
+        self.assertFalse(page_obj.has_next())
+        self.assertContains(response, f'?cursor={page_obj.continue_cursor}')
+        newest = list(Post.objects.order_by('-pub_date', '-pk'))
+        self.assertEqual(page_obj[0], newest[9])
+        response = self.guest_client.get(
+            f'/?cursor={page_obj.continue_cursor}'
+        )
+        self.assertTrue(response.context['page_obj'].cursor_mode)
+        self.assertEqual(response.context['page_obj'][0], newest[10])
+
 
 class FollowTest(TestCase):
     @classmethod
@@ -356,3 +645,287 @@ class FollowTest(TestCase):
         response = self.authorized_client1.get(reverse('posts:follow_index'))
         post_list = response.context.get('page_obj').object_list
         self.assertEqual(len(post_list), 0)
+
+    def test_new_post_pushed_to_follower_timeline(self):
+        Follow.objects.create(user=self.user1, author=self.user2)
+        new_post = Post.objects.create(text='Новый пост', author=self.user2)
+        self.assertTrue(
+            Timeline.objects.filter(user=self.user1, post=new_post).exists()
+        )
+        response = self.authorized_client1.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['page_obj'].object_list[0], new_post
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        self.authorized_client1.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.user2.username}
+            )
+        )
+        self.assertEqual(Timeline.objects.filter(user=self.user1).count(), 1)
+        self.authorized_client1.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.user2.username}
+            )
+        )
+        self.assertFalse(Timeline.objects.filter(user=self.user1).exists())
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=2)
+    def test_celebrity_posts_pulled_on_read(self):
+        fan = User.objects.create_user(username='fan')
+        regular = User.objects.create_user(username='regular')
+        Follow.objects.create(user=self.user1, author=self.user2)
+        Follow.objects.create(user=fan, author=self.user2)
+        Follow.objects.create(user=self.user1, author=regular)
+        regular_post = Post.objects.create(text='Обычный', author=regular)
+        celebrity_post = Post.objects.create(
+            text='Знаменитость', author=self.user2
+        )
+        self.assertFalse(
+            Timeline.objects.filter(post=celebrity_post).exists()
+        )
+        response = self.authorized_client1.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [celebrity_post, regular_post, self.post]
+        )
+
+    def test_follow_index_answers_conditional_requests(self):
+        url = reverse('posts:follow_index')
+        Follow.objects.create(user=self.user1, author=self.user2)
+        etag = self.authorized_client1.get(url)['ETag']
+        response = self.authorized_client1.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        other = Client()
+        other.force_login(self.user2)
+        self.assertEqual(
+            other.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+        Post.objects.create(text='Свежий', author=self.user2)
+        response = self.authorized_client1.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Свежий')
+        etag = response['ETag']
+        Follow.objects.filter(user=self.user1).delete()
+        response = self.authorized_client1.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotContains(response, 'Свежий')
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=2)
+    def test_celebrity_threshold_crossed_both_ways(self):
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.user1, author=self.user2)
+        Follow.objects.create(user=fan, author=self.user2)
+        famous_post = Post.objects.create(
+            text='Знаменитость', author=self.user2
+        )
+        self.assertFalse(Timeline.objects.filter(post=famous_post).exists())
+        Follow.objects.filter(user=fan).delete()
+        self.assertNotIn(self.user2.pk, timeline.celebrity_ids())
+        self.assertTrue(
+            Timeline.objects.filter(
+                user=self.user1, post=famous_post
+            ).exists()
+        )
+        response = self.authorized_client1.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [famous_post, self.post]
+        )
+        Follow.objects.create(user=fan, author=self.user2)
+        self.assertIn(self.user2.pk, timeline.celebrity_ids())
+        pulled_post = Post.objects.create(text='Снова', author=self.user2)
+        self.assertFalse(Timeline.objects.filter(post=pulled_post).exists())
+        response = self.authorized_client1.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [pulled_post, famous_post, self.post]
+        )
+
+    def test_follow_cursor_pages_without_duplicates(self):
+        Follow.objects.create(user=self.user1, author=self.user2)
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.user2)
+        for number in range(NUMBER_OF_POSTS):
+            Post.objects.create(text=f'Пост {number}', author=self.user2)
+        url = reverse('posts:follow_index')
+        response = self.authorized_client1.get(url, {'cursor': ''})
+        first_page = response.context['page_obj']
+        response = self.authorized_client1.get(
+            url, {'cursor': first_page.next_cursor}
+        )
+        seen = [post.pk for post in first_page] + [
+            post.pk for post in response.context['page_obj']
+        ]
+        self.assertEqual(
+            seen,
+            list(
+                self.user2.posts.order_by('-pub_date', '-pk')
+                .values_list('pk', flat=True)
+            )
+        )
+
+    def test_rebuild_timelines_command(self):
+        Follow.objects.create(user=self.user1, author=self.user2)
+        Timeline.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(Timeline.objects.values_list('user', 'post')),
+            [(self.user1.pk, self.post.pk)]
+        )
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='cursor_author')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.user)
+            for number in range(NUMBER_OF_POSTS)
+        )
+        cls.index_url = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_feed_once(self):
+        response = self.client.get(self.index_url, {'cursor': ''})
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), EXPECTED_POSTS_NUMBER)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        response = self.client.get(
+            self.index_url, {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(
+            len(second_page), EXPECTED_POSTS_NUMBER_ON_SECOND_PAGE
+        )
+        self.assertFalse(second_page.has_next())
+        seen = [post.pk for post in first_page] + [
+            post.pk for post in second_page
+        ]
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+        response = self.client.get(
+            self.index_url, {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in first_page]
+        )
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(self.index_url, {'cursor': '%%%'})
+        self.assertEqual(
+            len(response.context['page_obj']), EXPECTED_POSTS_NUMBER
+        )
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        for raw in (
+            f'n|2020-01-01T00:00:00+00:00|{10 ** 30}',
+            'n|2020-01-01T00:00:00|1',
+        ):
+            with self.subTest(raw=raw):
+                cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+                response = self.client.get(self.index_url, {'cursor': cursor})
+                self.assertEqual(
+                    len(response.context['page_obj']), EXPECTED_POSTS_NUMBER
+                )
+
+    def test_cursor_paginator_template_used(self):
+        response = self.client.get(self.index_url, {'cursor': ''})
+        self.assertTemplateUsed(
+            response, 'posts/includes/cursor_paginator.html'
+        )
+
+
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='archive_author')
+        cls.group = Group.objects.create(
+            title='Архивная группа', slug='archive-slug', description='Архив'
+        )
+        cls.march = Post.objects.create(
+            text='Мартовский пост', author=cls.user, group=cls.group
+        )
+        cls.may = Post.objects.create(text='Майский пост', author=cls.user)
+        for post, month in ((cls.march, 3), (cls.may, 5)):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.make_aware(datetime(2020, month, 15))
+            )
+        Post.objects.create(text='Свежий пост', author=cls.user)
+        cls.march_url = reverse(
+            'posts:archive_month', kwargs={'year': 2020, 'month': 3}
+        )
+        cls.may_url = reverse(
+            'posts:archive_month', kwargs={'year': 2020, 'month': 5}
+        )
+        now = timezone.localtime()
+        cls.current_url = reverse(
+            'posts:archive_month',
+            kwargs={'year': now.year, 'month': now.month}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_months_link_to_their_neighbours(self):
+        response = self.client.get(reverse('posts:archive'))
+        self.assertEqual(len(response.context['months']), 3)
+        self.assertContains(response, self.march_url)
+        response = self.client.get(self.march_url)
+        self.assertEqual(list(response.context['page_obj']), [self.march])
+        self.assertIsNone(response.context['previous'])
+        self.assertEqual(response.context['following'][1], self.may_url)
+        response = self.client.get(reverse(
+            'posts:group_archive_month',
+            kwargs={'slug': 'archive-slug', 'year': 2020, 'month': 3}
+        ))
+        self.assertContains(response, 'Мартовский пост')
+        self.assertIsNone(response.context['following'])
+
+    def test_empty_invalid_and_future_months_not_found(self):
+        next_year = timezone.localtime().year + 1
+        for year, month in ((2020, 4), (2020, 13), (next_year, 1)):
+            with self.subTest(year=year, month=month):
+                response = self.client.get(reverse(
+                    'posts:archive_month',
+                    kwargs={'year': year, 'month': month}
+                ))
+                self.assertEqual(response.status_code, 404)
+
+    def test_closed_months_cached_until_their_posts_change(self):
+        march = self.client.get(self.march_url)
+        current = self.client.get(self.current_url)
+        entry = cache.get(
+            feed_cache.page_key(march.wsgi_request, (
+                feed_cache.archive_scope(feed_cache.INDEX, 2020, 3),
+                feed_cache.archive_scope(feed_cache.INDEX),
+                feed_cache.USERS,
+            ))
+        )
+        self.assertEqual(entry['expires'], math.inf)
+        Post.objects.create(text='Ещё один пост', author=self.user)
+        for url, response, status in (
+            (self.march_url, march, 304), (self.current_url, current, 200),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                ).status_code, status)
+        post = Post.objects.get(pk=self.march.pk)
+        post.text = 'Исправленный мартовский пост'
+        post.save()
+        response = self.client.get(
+            self.march_url, HTTP_IF_NONE_MATCH=march['ETag']
+        )
+        self.assertContains(response, 'Исправленный мартовский пост')
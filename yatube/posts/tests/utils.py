@@ -0,0 +1,42 @@
+import zlib
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Asserts how many SQL queries a request may issue."""
+
+    def count_queries(self, client, url, method='get', data=None):
+        with CaptureQueriesContext(connection) as context:
+            getattr(client, method)(url, data)
+        return context
+
+    def assertQueryBudget(self, client, url, budget, method='get',
+                          data=None):
+        context = self.count_queries(client, url, method, data)
+        queries = '\n'.join(query['sql'] for query in context)
+        self.assertLessEqual(
+            len(context), budget,
+            f'{method.upper()} {url}: {len(context)} queries over the '
+            f'budget of {budget}:\n{queries}'
+        )
+
+
+def png_bomb(width, height):
+    """A PNG of a few kilobytes that decodes to ``width * height`` pixels."""
+    def chunk(kind, data):
+        body = kind + data
+        return (
+            len(data).to_bytes(4, 'big') + body
+            + zlib.crc32(body).to_bytes(4, 'big')
+        )
+    header = (
+        width.to_bytes(4, 'big') + height.to_bytes(4, 'big')
+        + bytes([8, 0, 0, 0, 0])
+    )
+    rows = zlib.compress(bytes(width + 1) * height, 9)
+    return (
+        b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+        + chunk(b'IDAT', rows) + chunk(b'IEND', b'')
+    )
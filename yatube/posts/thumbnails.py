@@ -0,0 +1,373 @@
+"""Post thumbnails are generated off the request path.
+
+Saving a post with a new image schedules a job for a background worker,
+which renders every geometry from ``settings.POST_THUMBNAILS`` in several
+widths and formats. Templates never generate thumbnails themselves: until
+the worker is done they show a placeholder.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import archive, feed_cache, tags
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = 'posts:thumbnails:{}'
+FAILED_KEY = 'posts:thumbnails:failed:{}'
+EVENTS = ('queued', 'generated', 'failed', 'latency', 'render')
+PLACEHOLDER_CLASS = 'thumbnail-pending'
+
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'GIF': 'image/gif',
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+Variant = namedtuple('Variant', 'width format geometry options')
+
+
+def source(image):
+    """The original as sorl-thumbnail sees it; keys depend on the storage."""
+    return ImageFile(str(image), Post._meta.get_field('image').storage)
+
+
+def can_encode(format_):
+    Image.init()
+    return format_ in Image.SAVE and format_ in EXTENSIONS
+
+
+def size(name):
+    """Width and height of the ``name`` picture, whatever the source."""
+    geometry_string, _ = settings.POST_THUMBNAILS[name]
+    return tuple(map(int, geometry_string.split('x')))
+
+
+def variants(image, name):
+    """Every file the ``name`` picture of ``image`` is made of.
+
+    Each width of ``settings.POST_IMAGE_WIDTHS`` up to the geometry width
+    is made in each modern format this Pillow build can encode, plus the
+    format of the original as the fallback, which goes last.
+    """
+    _, options = settings.POST_THUMBNAILS[name]
+    width, height = size(name)
+    widths = sorted(
+        {size for size in settings.POST_IMAGE_WIDTHS if size < width}
+        | {width}
+    )
+    original = default.backend._get_format(source(image))
+    formats = [
+        format_ for format_ in settings.POST_IMAGE_FORMATS
+        if format_ != original and can_encode(format_)
+    ]
+    formats.append(original)
+    return [
+        Variant(
+            size, format_, f'{size}x{round(height * size / width)}',
+            {**options, 'format': format_}
+        )
+        for format_ in formats for size in widths
+    ]
+
+
+class Picture:
+    """Generated variants of one image, ready for ``<picture>`` markup."""
+
+    def __init__(self, files):
+        self.files = files
+        formats = {}
+        for variant, thumbnail in files:
+            formats.setdefault(variant.format, []).append(
+                f'{thumbnail.url} {variant.width}w'
+            )
+        *modern, fallback = formats.items()
+        self.sources = [
+            {'type': MIME_TYPES[format_], 'srcset': ', '.join(srcset)}
+            for format_, srcset in modern
+        ]
+        self.srcset = ', '.join(fallback[1])
+        self.src = files[-1][1].url
+        self.width, self.height = map(int, files[-1][0].geometry.split('x'))
+
+
+def thumbnail_file(image, geometry_string, **options):
+    """The file sorl-thumbnail would create, computed without any I/O."""
+    backend = default.backend
+    original = source(image)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(original))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(
+        original, geometry_string, options
+    )
+    return ImageFile(name, default.storage)
+
+
+def _files(image, name):
+    return [
+        (variant, thumbnail_file(image, variant.geometry, **variant.options))
+        for variant in variants(image, name)
+    ]
+
+
+def _picture(files, found):
+    generated = [(variant, found[file_.key]) for variant, file_ in files]
+    if any(thumbnail is None for _, thumbnail in generated):
+        return None
+    return Picture(generated)
+
+
+def ready(image, name):
+    """Returns the generated Picture or None if it is not there yet."""
+    if not image:
+        return None
+    files = _files(image, name)
+    return _picture(
+        files, default.kvstore.get_many(file_ for _, file_ in files)
+    )
+
+
+def prefetch(posts, name):
+    """Resolves the pictures of a whole page with one store lookup.
+
+    Results are kept on the posts for ``post_thumbnail``; missing ones are
+    queued right away.
+    """
+    posts = [post for post in posts if post.image]
+    if not posts:
+        return
+    files = {post.pk: _files(post.image, name) for post in posts}
+    found = default.kvstore.get_many(
+        file_ for post_files in files.values() for _, file_ in post_files
+    )
+    missing = set()
+    for post in posts:
+        picture = _picture(files[post.pk], found)
+        post._thumbnails = {
+            **getattr(post, '_thumbnails', {}), name: picture
+        }
+        if picture is None:
+            missing.add(post.image.name)
+    schedule_many(missing)
+
+
+def _count(event, value=1):
+    key = STATS_KEY.format(event)
+    if not cache.add(key, value, None):
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.set(key, value, None)
+
+
+def stats():
+    keys = {STATS_KEY.format(event): event for event in EVENTS}
+    values = cache.get_many(keys)
+    counts = {event: values.get(key, 0) for key, event in keys.items()}
+    done = counts['generated'] + counts['failed']
+    return {
+        'queue': max(counts['queued'] - done, 0),
+        'generated': counts['generated'],
+        'failed': counts['failed'],
+        'latency': counts['latency'] / done if done else 0,
+        'render': counts['render'] / done if done else 0,
+    }
+
+
+def generate(image):
+    """Renders every variant of ``image``, returns success."""
+    for name in settings.POST_THUMBNAILS:
+        for variant in variants(image, name):
+            get_thumbnail(
+                source(image), variant.geometry, **variant.options
+            )
+    return all(ready(image, name) for name in settings.POST_THUMBNAILS)
+
+
+def pending(images):
+    """Those of ``images`` missing some thumbnail, with one store lookup."""
+    files = {
+        image: [
+            file_ for name in settings.POST_THUMBNAILS
+            for _, file_ in _files(image, name)
+        ]
+        for image in images
+    }
+    found = default.kvstore.get_many(
+        file_ for image_files in files.values() for file_ in image_files
+    )
+    return [
+        image for image, image_files in files.items()
+        if any(found[file_.key] is None for file_ in image_files)
+    ]
+
+
+def forget(images):
+    """Drops the store entries of every thumbnail of ``images``.
+
+    ``generate`` then looks at the storage again and renders whatever is
+    not there, as after moving thumbnails to another storage.
+    """
+    default.kvstore.delete_many(
+        file_ for image in images for name in settings.POST_THUMBNAILS
+        for _, file_ in _files(image, name)
+    )
+
+
+def generate_many(images):
+    """Renders ``images`` one by one, returns the names that failed.
+
+    Runs in the processes of ``generate_thumbnails`` too.
+    """
+    failed = []
+    for image in images:
+        try:
+            done = generate(image)
+        except Exception:
+            logger.exception('Thumbnails for %s failed', image)
+            done = False
+        if not done:
+            failed.append(image)
+    return failed
+
+
+def signature():
+    """Changes whenever the set of thumbnails to render changes."""
+    return repr((
+        sorted(settings.POST_THUMBNAILS.items()),
+        settings.POST_IMAGE_WIDTHS,
+        settings.POST_IMAGE_FORMATS,
+    ))
+
+
+def invalidate_pages(image):
+    """Bumps every page that shows a post with ``image``.
+
+    Months that are over and tag pages are cached for much longer than
+    the feeds, so their scopes are bumped too or they keep the
+    placeholder.
+    """
+    scopes = set()
+    posts = Post.objects.filter(image=image).select_related(
+        'author', 'group'
+    ).only('text', 'pub_date', 'author__username', 'group__slug')
+    for post in posts:
+        slugs = [post.group.slug] if post.group else []
+        scopes.add(feed_cache.author_scope(post.author.username))
+        scopes.update(map(feed_cache.group_scope, slugs))
+        scopes.update(archive.month_scopes(post, slugs))
+        scopes.update(tags.scopes(
+            tags.parse_tags(post.text), tags.parse_mentions(post.text)
+        ))
+    if scopes:
+        feed_cache.bump(feed_cache.INDEX, *scopes)
+
+
+class Worker:
+    """A single daemon thread working through a queue of image names.
+
+    With ``POST_THUMBNAILS_ASYNC`` off, jobs are processed by the thread
+    that queues them.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def put(self, image):
+        if not settings.POST_THUMBNAILS_ASYNC:
+            _count('queued')
+            self.process(image, time.monotonic())
+            return
+        with self.lock:
+            if image in self.pending:
+                return
+            self.pending.add(image)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='post-thumbnails', daemon=True
+                )
+                self.thread.start()
+        _count('queued')
+        self.queue.put((image, time.monotonic()))
+
+    def run(self):
+        while True:
+            image, queued = self.queue.get()
+            try:
+                self.process(image, queued)
+            finally:
+                with self.lock:
+                    self.pending.discard(image)
+                self.queue.task_done()
+                connection.close()
+
+    def process(self, image, queued):
+        started = time.monotonic()
+        try:
+            done = generate(image)
+        except Exception:
+            logger.exception('Thumbnails for %s failed', image)
+            done = False
+        finished = time.monotonic()
+        _count('latency', int((finished - queued) * 1000))
+        _count('render', int((finished - started) * 1000))
+        if not done:
+            _count('failed')
+            cache.set(
+                FAILED_KEY.format(image), 1,
+                settings.POST_THUMBNAIL_RETRY_TIMEOUT
+            )
+            return
+        _count('generated')
+        logger.info(
+            'Thumbnails for %s ready in %.0fms, %d queued',
+            image, (finished - queued) * 1000, self.queue.qsize()
+        )
+        invalidate_pages(image)
+
+    def join(self):
+        self.queue.join()
+
+
+worker = Worker()
+
+
+def schedule(image):
+    """Queues thumbnails of ``image`` once the current transaction commits."""
+    if image:
+        schedule_many({str(image)})
+
+
+def schedule_many(images):
+    if not images:
+        return
+    keys = {FAILED_KEY.format(image): image for image in images}
+    failed = cache.get_many(keys)
+    for key, image in keys.items():
+        if key not in failed:
+            transaction.on_commit(lambda image=image: worker.put(image))
@@ -0,0 +1,260 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AuthorStats, Follow, Post, Timeline
+from .utils import POST_KEYSET, Keyset, batches
+
+BATCH_SIZE = 1000
+CELEBRITIES_CACHE_KEY = 'posts:timeline:celebrities'
+
+
+def _entries(users, post):
+    return [
+        Timeline(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+        for user_id in users
+    ]
+
+
+def celebrity_ids():
+    """Authors whose posts are pulled on read instead of pushed on write.
+
+    Writes check the same cached set, so a post is either pushed or
+    pulled whatever the age of the cache.
+    """
+    ids = cache.get(CELEBRITIES_CACHE_KEY)
+    if ids is None:
+        ids = frozenset(
+            AuthorStats.objects.filter(
+                celebrity_since__isnull=False
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(
+            CELEBRITIES_CACHE_KEY, ids,
+            settings.FEED_CELEBRITY_CACHE_TIMEOUT
+        )
+    return ids
+
+
+def _push_since(author_id, since):
+    """Push the posts an author wrote as a celebrity to their followers."""
+    posts = list(
+        Post.objects.filter(
+            author_id=author_id, pub_date__gte=since
+        ).values_list('pk', 'pub_date')
+    )
+    if not posts:
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for users in batches(
+        followers.iterator(), max(BATCH_SIZE // len(posts), 1)
+    ):
+        Timeline.objects.bulk_create(
+            [
+                Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+                for user_id in users for post_id, pub_date in posts
+            ],
+            ignore_conflicts=True
+        )
+
+
+def update_celebrity(author_id):
+    """Move an author in or out of the celebrities by followers count.
+
+    Posts written while the author was a celebrity were never pushed, so
+    they are pushed on the way out; otherwise they would be in no feed.
+    """
+    stats = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', 'celebrity_since'
+    ).first()
+    if stats is None:
+        return
+    followers_count, since = stats
+    famous = followers_count >= settings.FEED_CELEBRITY_FOLLOWERS
+    if famous and since is None:
+        AuthorStats.objects.filter(
+            user_id=author_id, celebrity_since__isnull=True
+        ).update(celebrity_since=timezone.now())
+        cache.delete(CELEBRITIES_CACHE_KEY)
+    elif not famous and since is not None:
+        if AuthorStats.objects.filter(
+            user_id=author_id, celebrity_since=since
+        ).update(celebrity_since=None):
+            # New posts are pushed from now on, the older ones right after.
+            cache.delete(CELEBRITIES_CACHE_KEY)
+            _push_since(author_id, since)
+
+
+def update_celebrities():
+    """Bring every author to the side of the threshold they belong to.
+
+    For counters fixed in bulk and a changed FEED_CELEBRITY_FOLLOWERS.
+    Returns the number of authors moved.
+    """
+    threshold = settings.FEED_CELEBRITY_FOLLOWERS
+    authors = AuthorStats.objects.filter(
+        Q(followers_count__gte=threshold, celebrity_since__isnull=True)
+        | Q(followers_count__lt=threshold, celebrity_since__isnull=False)
+    ).values_list('user_id', flat=True)
+    moved = 0
+    for author_id in authors.iterator():
+        update_celebrity(author_id)
+        moved += 1
+    return moved
+
+
+def fan_out(post):
+    """Push a new post into the timelines of all followers of its author.
+
+    Posts of celebrities are skipped: their followers pull them on read.
+    Returns the number of timeline entries written.
+    """
+    if post.author_id in celebrity_ids():
+        return 0
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    written = 0
+    for users in batches(followers.iterator(), BATCH_SIZE):
+        Timeline.objects.bulk_create(
+            _entries(users, post), ignore_conflicts=True
+        )
+        written += len(users)
+    return written
+
+
+def backfill(user_id, author_id):
+    """Copy the existing posts of a newly followed author."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    for batch in batches(posts.iterator(), BATCH_SIZE):
+        Timeline.objects.bulk_create(
+            [
+                Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+                for post_id, pub_date in batch
+            ],
+            ignore_conflicts=True
+        )
+
+
+def prune(user_id, author_id):
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild():
+    update_celebrities()
+    Timeline.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id)
+
+
+TIMELINE_KEYSET = Keyset(
+    'timeline_entries__pub_date', 'timeline_entries__post__id'
+)
+
+
+class MergedKeyset:
+    def order(self, feed, backwards=False):
+        return MergedFeed(
+            feed.user, feed.celebrities, feed.cursor, backwards
+        )
+
+    def seek(self, feed, pub_date, pk, backwards=False):
+        return MergedFeed(
+            feed.user, feed.celebrities, (pub_date, pk), backwards
+        )
+
+
+class MergedFeed:
+    """Pushed timeline merged with posts pulled from celebrity authors.
+
+    Both sources are read in feed order and merged lazily, so slicing
+    ``[start:stop]`` holds at most ``stop`` rows from each source.
+    Without celebrities the timeline is sliced directly.
+    """
+
+    keyset = MergedKeyset()
+
+    def __init__(self, user, celebrities=(), cursor=None, backwards=False):
+        self.user = user
+        self.celebrities = celebrities
+        self.cursor = cursor
+        self.backwards = backwards
+
+    @property
+    def pushed(self):
+        # The timeline join and the cursor condition must share one
+        # filter() call, otherwise Django joins the timeline twice.
+        condition = Q(timeline_entries__user=self.user)
+        if self.cursor:
+            condition &= TIMELINE_KEYSET.condition(
+                *self.cursor, self.backwards
+            )
+        queryset = Post.objects.filter(condition).select_related(
+            'author', 'group'
+        )
+        if self.celebrities:
+            queryset = queryset.exclude(author_id__in=self.celebrities)
+        return TIMELINE_KEYSET.order(queryset, self.backwards)
+
+    @property
+    def pulled(self):
+        if not self.celebrities:
+            return None
+        queryset = Post.objects.filter(
+            author_id__in=self.celebrities
+        ).select_related('author', 'group')
+        if self.cursor:
+            queryset = POST_KEYSET.seek(
+                queryset, *self.cursor, self.backwards
+            )
+        return POST_KEYSET.order(queryset, self.backwards)
+
+    def count(self):
+        if not self.celebrities:
+            return self.pushed.count()
+        return self.pushed.count() + self.pulled.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self._merge(None)
+
+    def __getitem__(self, key):
+        if not self.celebrities:
+            return self.pushed[key]
+        if isinstance(key, slice):
+            return list(islice(self._merge(key.stop), key.start, key.stop))
+        return next(islice(self._merge(key + 1), key, None))
+
+    def _merge(self, stop):
+        pushed, pulled = self.pushed, self.pulled
+        if pulled is None:
+            return iter(pushed if stop is None else pushed[:stop])
+        if stop is not None:
+            pushed, pulled = pushed[:stop], pulled[:stop]
+        return heapq.merge(
+            pushed.iterator(), pulled.iterator(),
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=not self.backwards,
+        )
+
+
+def feed_for(user):
+    celebrities = list(
+        Follow.objects.filter(
+            user=user, author_id__in=celebrity_ids()
+        ).values_list('author_id', flat=True)
+    )
+    return MergedFeed(user, celebrities)
@@ -0,0 +1,107 @@
+"""Image uploads are spooled to disk and decoded off the request thread.
+
+Every upload is streamed into a temporary file. Nothing past
+``settings.UPLOAD_MAX_SIZE`` is written, and such files are rejected by
+size alone. ``validate`` checks the pixel count from the image header
+before anything is decoded; the full decode then runs in a small pool, so
+at most ``settings.POST_IMAGE_VERIFY_WORKERS`` images are in memory at
+once.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat, floatformat
+from PIL import Image
+
+from . import images
+
+_slots = threading.BoundedSemaphore(settings.POST_IMAGE_VERIFY_WORKERS)
+_pool = ThreadPoolExecutor(
+    settings.POST_IMAGE_VERIFY_WORKERS, thread_name_prefix='image-verify'
+)
+
+
+class Busy(Exception):
+    """Every verification slot stayed taken for the whole timeout."""
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Spools uploads to disk and drops the bytes past the size cap.
+
+    The file still reports the full size the client sent, so validation
+    can tell it was cut short.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.UPLOAD_MAX_SIZE:
+            self.file.write(raw_data)
+
+
+def _decode(file):
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            # Unlike verify(), load() spots truncated files too.
+            image.load()
+            return images.summarize(image)
+    finally:
+        file.seek(0)
+
+
+def verify(file):
+    """Decodes ``file`` in the pool and returns its image metadata."""
+    if not _slots.acquire(timeout=settings.POST_IMAGE_VERIFY_TIMEOUT):
+        raise Busy
+    try:
+        return _pool.submit(_decode, file).result()
+    finally:
+        _slots.release()
+
+
+def too_large(file):
+    return file is not None and file.size > settings.UPLOAD_MAX_SIZE
+
+
+def size_error():
+    return ValidationError(
+        'Файл больше %(limit)s.', code='too_large',
+        params={'limit': filesizeformat(settings.UPLOAD_MAX_SIZE)}
+    )
+
+
+def validate(file):
+    """Rejects ``file`` unless its pixels fit the limit and it decodes.
+
+    Django's ImageField has only read the header by now; the metadata of
+    the full decode is kept on the file for ``images.describe``.
+    """
+    width, height = file.image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение больше %(limit)s мегапикселей.',
+            code='too_many_pixels',
+            params={
+                'limit': floatformat(settings.POST_IMAGE_MAX_PIXELS / 10 ** 6)
+            }
+        )
+    try:
+        file.image_metadata = verify(file)
+    except Busy:
+        raise ValidationError(
+            'Сервер занят, попробуйте загрузить изображение позже.',
+            code='busy'
+        )
+    except Exception as exc:
+        raise ValidationError(
+            'Загрузите правильное изображение. Файл, который вы '
+            'загрузили, поврежден или не является изображением.',
+            code='invalid_image'
+        ) from exc
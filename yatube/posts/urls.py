@@ -9,6 +9,39 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('search/', views.post_search, name='post_search'),
+    path('tags/<str:name>/', views.tag_posts, name='tag_posts'),
+    path(
+        'profile/<str:username>/mentions/',
+        views.profile_mentions,
+        name='profile_mentions'
+    ),
+    path('archive/', views.archive_index, name='archive'),
+    path(
+        'archive/<int:year>/<int:month>/',
+        views.archive_month,
+        name='archive_month'
+    ),
+    path(
+        'group/<slug:slug>/archive/',
+        views.group_archive,
+        name='group_archive'
+    ),
+    path(
+        'group/<slug:slug>/archive/<int:year>/<int:month>/',
+        views.group_archive_month,
+        name='group_archive_month'
+    ),
+    path(
+        'profile/<str:username>/archive/',
+        views.profile_archive,
+        name='profile_archive'
+    ),
+    path(
+        'profile/<str:username>/archive/<int:year>/<int:month>/',
+        views.profile_archive_month,
+        name='profile_archive_month'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.create_post, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
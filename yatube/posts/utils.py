@@ -1,8 +1,263 @@
+import base64
+import binascii
+from datetime import datetime
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_PARAM = 'cursor'
+CURSOR_SEPARATOR = '|'
+NEXT = 'n'
+PREVIOUS = 'p'
+# The largest id a database column can hold.
+MAX_ID = 2 ** 63 - 1
+
+
+def batches(items, batch_size):
+    """Lists of up to ``batch_size`` consecutive ``items``."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def pk_batches(queryset, batch_size):
+    """Ids of ``queryset`` in batches, each one an index range scan.
+
+    Rows added or deleted meanwhile do not shift the batches.
+    """
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        batch = list(ids.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def encode_cursor(post, direction):
+    raw = CURSOR_SEPARATOR.join(
+        (direction, post.pub_date.isoformat(), str(post.pk))
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def parse_id(value):
+    """An id from a string, ValueError when no row can have it."""
+    pk = int(value)
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(value)
+    return pk
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split(CURSOR_SEPARATOR)
+        if direction not in (NEXT, PREVIOUS):
+            raise ValueError(direction)
+        pub_date = datetime.fromisoformat(pub_date)
+        if pub_date.tzinfo is None:
+            raise ValueError(pub_date)
+        return direction, pub_date, parse_id(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class CursorPage:
+    cursor_mode = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s posts>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class Keyset:
+    """Orders and seeks a queryset by a (date, id) pair of fields."""
+
+    def __init__(self, date_field='pub_date', pk_field='pk'):
+        self.date_field = date_field
+        self.pk_field = pk_field
+
+    def order(self, queryset, backwards=False):
+        if backwards:
+            return queryset.order_by(self.date_field, self.pk_field)
+        return queryset.order_by(
+            '-' + self.date_field, '-' + self.pk_field
+        )
+
+    def condition(self, pub_date, pk, backwards=False):
+        lookup = 'gt' if backwards else 'lt'
+        return (
+            Q(**{f'{self.date_field}__{lookup}': pub_date})
+            | Q(**{self.date_field: pub_date,
+                   f'{self.pk_field}__{lookup}': pk})
+        )
+
+    def seek(self, queryset, pub_date, pk, backwards=False):
+        return queryset.filter(self.condition(pub_date, pk, backwards))
+
+
+POST_KEYSET = Keyset()
+
+
+class CursorPaginator:
+    """Keyset pagination over (pub_date, id), newest first.
+
+    Every page is a bounded range read from the cursor position, so the
+    cost of a page does not depend on how deep it is.
+    """
+
+    def __init__(self, queryset, per_page, keyset=POST_KEYSET):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keyset = keyset
+
+    def get_page(self, token=None):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return self._page(self.queryset, backwards=False, first=True)
+        direction, pub_date, pk = cursor
+        backwards = direction == PREVIOUS
+        queryset = self.keyset.seek(self.queryset, pub_date, pk, backwards)
+        return self._page(queryset, backwards)
+
+    def _page(self, queryset, backwards, first=False):
+        queryset = self.keyset.order(queryset, backwards)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows)
+        has_next = not backwards and has_more or backwards
+        has_previous = backwards and has_more or not backwards and not first
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], NEXT) if has_next else None,
+            previous_cursor=(
+                encode_cursor(rows[0], PREVIOUS) if has_previous else None
+            ),
+        )
+
+
+def get_cursor_page(request, queryset):
+    keyset = getattr(queryset, 'keyset', POST_KEYSET)
+    paginator = CursorPaginator(queryset, settings.POSTS_PER_PAGE, keyset)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+
+class CountedPaginator(Paginator):
+    """A Paginator that takes the total from ``count`` when it is given.
+
+    The total may be slightly stale, so pages are always sliced to full
+    size: a page past the real end is empty, and the last page of a total
+    that is too low still shows every post that fits on it.
+
+    Pages past ``max_page`` are not reachable by number, so no request
+    costs a deeper OFFSET; the last numbered page links on to cursor
+    pagination through ``continue_cursor`` instead.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count=None, max_page=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+        self.max_page = max_page
+
+    @cached_property
+    def count(self):
+        if self.known_count is None:
+            return Paginator.count.func(self)
+        return self.known_count
+
+    @cached_property
+    def num_pages(self):
+        num_pages = Paginator.num_pages.func(self)
+        if self.max_page:
+            return min(num_pages, self.max_page)
+        return num_pages
+
+    @property
+    def truncated(self):
+        return self.num_pages < Paginator.num_pages.func(self)
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Page numbers around ``number`` and at both ends, with gaps."""
+        number = self.validate_number(number)
+        last = self.num_pages
+        shown = set(range(1, min(on_ends, last) + 1))
+        shown |= set(range(max(last - on_ends + 1, 1), last + 1))
+        shown |= set(range(
+            max(number - on_each_side, 1),
+            min(number + on_each_side, last) + 1
+        ))
+        previous = 0
+        for page_number in sorted(shown):
+            if page_number - previous > 1:
+                yield self.ELLIPSIS
+            yield page_number
+            previous = page_number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        page = self._get_page(
+            list(self.object_list[bottom:bottom + self.per_page]),
+            number, self
+        )
+        page.elided_page_range = list(self.get_elided_page_range(number))
+        page.continue_cursor = None
+        if number == self.num_pages and self.truncated and page.object_list:
+            page.continue_cursor = encode_cursor(page.object_list[-1], NEXT)
+        return page
+
 
+def get_paginator(request, queryset, count=None):
+    """A page of ``queryset``; ``count`` spares the paginator a COUNT(*).
 
-def get_paginator(request, queryset):
-    paginator = Paginator(queryset, settings.POSTS_PER_PAGE)
+    ``count`` may be a number or a callable returning one, which is not
+    called in cursor mode.
+    """
+    if settings.POSTS_CURSOR_PAGINATION or CURSOR_PARAM in request.GET:
+        return get_cursor_page(request, queryset)
+    if callable(count):
+        count = count()
+    paginator = CountedPaginator(
+        queryset, settings.POSTS_PER_PAGE, count, settings.POSTS_MAX_PAGE
+    )
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
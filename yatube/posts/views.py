@@ -1,29 +1,42 @@
+from datetime import date
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
 
+from . import archive, page_counts, search, tags, timeline
+from .conditional import (follow_etag, follow_last_modified, post_etag,
+                          post_last_modified)
+from .feed_cache import (INDEX, USERS, archive_scope, author_scope,
+                         cache_feed, group_scope, mention_scope, tag_scope)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import get_paginator
+from .models import Follow, Group, Post, Tag
+from .utils import get_cursor_page, get_paginator
 
 User = get_user_model()
 
 
-@cache_page(20)
+@cache_feed(lambda: (INDEX, USERS))
 def index(request):
     post_list = Post.objects.select_related('group', 'author')
-    page_obj = get_paginator(request, post_list)
+    page_obj = get_paginator(request, post_list, page_counts.index)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_feed(lambda slug: (group_scope(slug), USERS))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = get_paginator(request, post_list)
+    post_list = group.posts.select_related('author', 'group')
+    page_obj = get_paginator(
+        request, post_list, lambda: page_counts.group(group)
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -31,13 +44,18 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_feed(lambda username: (author_scope(username), USERS))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.select_related('group')
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
         author=author).exists()
-    page_obj = get_paginator(request, post_list)
+    page_obj = get_paginator(
+        request, post_list, lambda: page_counts.author(author)
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -46,9 +64,146 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def _month_link(url_name, month, **kwargs):
+    return month, reverse(
+        url_name, kwargs={**kwargs, 'year': month.year, 'month': month.month}
+    )
+
+
+def _archive(request, post_list, url_name, context, **kwargs):
+    context['months'] = [
+        _month_link(url_name, month, **kwargs)
+        for month in archive.months(post_list)
+    ]
+    return render(request, 'posts/archive.html', context)
+
+
+def _archive_month(request, post_list, year, month, url_name, context,
+                   **kwargs):
+    month_list = archive.month_posts(post_list, year, month)
+    page_obj = get_paginator(request, month_list)
+    if not page_obj.object_list:
+        raise Http404('В этом месяце постов нет')
+    previous, following = archive.neighbours(post_list, year, month)
+    context.update({
+        'page_obj': page_obj,
+        'month': date(year, month, 1),
+        'previous': previous and _month_link(url_name, previous, **kwargs),
+        'following': following and _month_link(url_name, following, **kwargs),
+    })
+    return render(request, 'posts/archive_month.html', context)
+
+
+@cache_feed(lambda: (archive_scope(INDEX), USERS))
+def archive_index(request):
+    return _archive(
+        request, Post.objects.all(), 'posts:archive_month',
+        {'title': 'Все посты'}
+    )
+
+
+@cache_feed(
+    lambda year, month: (
+        archive_scope(INDEX, year, month), archive_scope(INDEX), USERS
+    ),
+    archive.timeout
+)
+def archive_month(request, year, month):
+    return _archive_month(
+        request, Post.objects.select_related('group', 'author'), year, month,
+        'posts:archive_month', {'title': 'Все посты'}
+    )
+
+
+@cache_feed(lambda slug: (archive_scope(group_scope(slug)), USERS))
+def group_archive(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _archive(
+        request, group.posts.all(), 'posts:group_archive_month',
+        {'title': group.title, 'group': group}, slug=slug
+    )
+
+
+@cache_feed(
+    lambda slug, year, month: (
+        archive_scope(group_scope(slug), year, month),
+        archive_scope(group_scope(slug)), USERS
+    ),
+    archive.timeout
+)
+def group_archive_month(request, slug, year, month):
+    group = get_object_or_404(Group, slug=slug)
+    return _archive_month(
+        request, group.posts.select_related('author', 'group'), year, month,
+        'posts:group_archive_month', {'title': group.title, 'group': group},
+        slug=slug
+    )
+
+
+@cache_feed(lambda username: (archive_scope(author_scope(username)), USERS))
+def profile_archive(request, username):
+    author = get_object_or_404(User, username=username)
+    return _archive(
+        request, author.posts.all(), 'posts:profile_archive_month',
+        {'title': author.get_full_name(), 'author': author},
+        username=username
+    )
+
+
+@cache_feed(
+    lambda username, year, month: (
+        archive_scope(author_scope(username), year, month),
+        archive_scope(author_scope(username)), USERS
+    ),
+    archive.timeout
+)
+def profile_archive_month(request, username, year, month):
+    author = get_object_or_404(User, username=username)
+    return _archive_month(
+        request, author.posts.select_related('group'), year, month,
+        'posts:profile_archive_month',
+        {'title': author.get_full_name(), 'author': author},
+        username=username
+    )
+
+
+@cache_feed(lambda name: (tag_scope(name.lower()), USERS))
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    context = {
+        'tag': tag,
+        'page_obj': get_cursor_page(request, tags.tag_feed(tag)),
+    }
+    return render(request, 'posts/tag_posts.html', context)
+
+
+@cache_feed(lambda username: (mention_scope(username), USERS))
+def profile_mentions(request, username):
+    author = get_object_or_404(User, username=username)
+    context = {
+        'author': author,
+        'page_obj': get_cursor_page(request, tags.mention_feed(author)),
+    }
+    return render(request, 'posts/mentions.html', context)
+
+
+@cache_feed(lambda: (INDEX, USERS))
+def post_search(request):
+    query = request.GET.get(search.QUERY_PARAM, '').strip()
+    context = {
+        'query': query,
+        'page_obj': search.search_page(request) if query else None,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@vary_on_cookie
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    comments = post.comments.select_related('author')
     form = CommentForm()
     context = {
         'post': post,
@@ -72,7 +227,7 @@ def create_post(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('posts:post_detail', post_id=post_id)
 
     form = PostForm(
@@ -93,8 +248,10 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    comments = post.comments.select_related('author')
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -111,9 +268,13 @@ def add_comment(request, post_id):
 
 
 @login_required
+@vary_on_cookie
+@condition(etag_func=follow_etag, last_modified_func=follow_last_modified)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_paginator(request, post_list)
+    post_list = timeline.feed_for(request.user)
+    page_obj = get_paginator(
+        request, post_list, lambda: page_counts.feed(request.user)
+    )
     context = {'page_obj': page_obj, }
     return render(request, 'posts/follow.html', context)
 
@@ -5,11 +5,29 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+CACHE_URL = os.getenv('YATUBE_CACHE_URL', '')
+
+if CACHE_URL.startswith('redis://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.redis_cache.RedisCache',
+            'LOCATION': CACHE_URL,
+            'OPTIONS': {
+                'MAX_CONNECTIONS': int(
+                    os.getenv('YATUBE_CACHE_MAX_CONNECTIONS', 20)
+                ),
+                'SOCKET_TIMEOUT': float(
+                    os.getenv('YATUBE_CACHE_SOCKET_TIMEOUT', 0.5)
+                ),
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 SECRET_KEY = '@38=jia9h-od+cy^^4igjai6496&^zr#+u=(x9ha)lp(m^^h6h'
 
@@ -111,8 +129,51 @@ USE_TZ = True
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+# 'X-Accel-Redirect' behind nginx, 'X-Sendfile' behind Apache or lighttpd:
+# the proxy then sends media and static files itself.
+SENDFILE_HEADER = os.getenv('YATUBE_SENDFILE_HEADER', '')
+# nginx: location /internal/media/ { internal; alias <MEDIA_ROOT>/; }
+# and the same for /internal/static/ and STATIC_ROOT.
+SENDFILE_PREFIX = '/internal/'
 
 POSTS_PER_PAGE: int = 10
+POSTS_CURSOR_PAGINATION: bool = False
+POSTS_MAX_PAGE: int = 100
+POST_COUNT_TIMEOUT: int = 60
+POST_COUNT_ESTIMATE_THRESHOLD: int = 100000
+# posts.search.backends.LikeBackend for databases without SQLite FTS5.
+POSTS_SEARCH_BACKEND: str = 'posts.search.backends.FTS5Backend'
+
+FEED_CELEBRITY_FOLLOWERS: int = 10000
+FEED_CELEBRITY_CACHE_TIMEOUT: int = 60 * 5
+FEED_CACHE_TIMEOUT: int = 60 * 60 * 6
+FEED_CACHE_STALE_TIMEOUT: int = 60
+FEED_CACHE_LOCK_TIMEOUT: int = 10
+FEED_CACHE_LOCK_WAIT: float = 2.0
+FEED_CACHE_EARLY_BETA: float = 1.0
+# Pages of months that are over; 0 keeps them until a post in them changes.
+ARCHIVE_CACHE_TIMEOUT: int = 0
+POST_CARD_CACHE_TIMEOUT: int = 60 * 60 * 24
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+POST_IMAGE_WIDTHS = (480, 960)
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP')
+POST_THUMBNAIL_RETRY_TIMEOUT: int = 60 * 10
+# Off renders thumbnails on commit in the saving thread, as tests need with
+# an in-memory database that a worker thread cannot write to.
+POST_THUMBNAILS_ASYNC: bool = True
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+
+FILE_UPLOAD_HANDLERS = ['posts.uploads.LimitedUploadHandler']
+UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS: int = 40 * 1000 * 1000
+POST_IMAGE_VERIFY_WORKERS: int = 2
+POST_IMAGE_VERIFY_TIMEOUT: float = 10.0
+MEDIA_GC_GRACE_PERIOD: int = 60 * 60 * 24
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
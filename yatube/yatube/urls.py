@@ -1,7 +1,10 @@
+import re
+
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import serve_media, serve_static
 
 urlpatterns = [
     path('', include('posts.urls')),
@@ -14,7 +17,15 @@ urlpatterns = [
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.csrf_failure'
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+# With SENDFILE_HEADER set the proxy sends the files, Django only checks
+# the path and sets the headers.
+urlpatterns += [
+    re_path(
+        r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        serve_media
+    ),
+    re_path(
+        r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+        serve_static
+    ),
+]